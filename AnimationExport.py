@@ -0,0 +1,127 @@
+"""
+AnimationExport.py
+Headless export of the animated examples (Example_A1, Example2) to video or
+PNG frame sequences. The frame range is split across a process pool; every
+worker loads the example on the Agg backend and renders its share of the
+frames in parallel. The frames are then encoded with a local ffmpeg, or left
+as a frame directory when no encoder is available.
+
+An example is exportable when it defines, at module level, its figure as
+fig and the arguments of its FuncAnimation as animation_kwargs (func,
+init_func, frames, interval), and only starts the live animation under
+if __name__ == "__main__".
+
+Usage:
+    python AnimationExport.py Example2.py Example2.mp4 --workers 8
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import argparse
+import os
+import runpy
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+FRAME_PATTERN = 'frame_%05d.png'
+
+# Load an example without showing it: the Agg backend has no window, and the
+# __main__ guard keeps the live animation from starting
+def load_example(script_path):
+    import matplotlib
+    matplotlib.use('Agg')
+    return runpy.run_path(script_path, run_name='__export__')
+
+# Frame values of an example, as FuncAnimation would iterate them
+def frame_values(frames):
+    if isinstance(frames, int):
+        return list(range(frames))
+    return list(frames)
+
+# Render frames[start:stop] of an example to PNG files in frame_dir. Frame
+# functions may keep state (Example2 advances W on every call), so frames
+# 0..start-1 are replayed without drawing before the first saved frame.
+def render_frames(script_path, frame_dir, start, stop, dpi=100):
+    example = load_example(script_path)
+    fig = example['fig']
+    kwargs = example['animation_kwargs']
+    func = kwargs['func']
+    frames = frame_values(kwargs['frames'])
+    if kwargs.get('init_func') is not None:
+        kwargs['init_func']()
+    for frame in frames[:start]:
+        func(frame)
+    for index in range(start, stop):
+        func(frames[index])
+        fig.savefig(os.path.join(frame_dir, FRAME_PATTERN % index), dpi=dpi)
+    return stop - start
+
+# Encode the first n_frames frames of a frame directory with ffmpeg (H.264,
+# even frame size for yuv420p)
+def encode_video(frame_dir, output, fps, n_frames, encoder='ffmpeg'):
+    subprocess.run([encoder, '-y', '-loglevel', 'error', '-framerate', str(fps),
+                    '-i', os.path.join(frame_dir, FRAME_PATTERN), '-frames:v', str(n_frames),
+                    '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', output],
+                   check=True)
+
+# Export an example. Frames are rendered by n_workers processes, each taking
+# one contiguous block of the frame range, into a fresh temporary directory
+# next to output. Returns the video path; when no encoder is found (or
+# frames_only is set) the frames are moved to <output>_frames instead and that
+# directory is returned. An existing, non-empty <output>_frames is never
+# overwritten.
+def export_animation(script_path, output, n_workers=None, dpi=100, fps=None, frames_only=False, encoder='ffmpeg'):
+    frame_dir = os.path.splitext(output)[0] + '_frames'
+    keep_frames = frames_only or shutil.which(encoder) is None
+    if keep_frames and os.path.isdir(frame_dir) and os.listdir(frame_dir):
+        raise FileExistsError(f"{frame_dir} is not empty; remove it or choose another output")
+
+    example = load_example(script_path)
+    kwargs = example['animation_kwargs']
+    n_frames = len(frame_values(kwargs['frames']))
+    if fps is None:
+        fps = 1000 / kwargs.get('interval', 200)
+
+    render_dir = tempfile.mkdtemp(prefix='.frames_', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        n_workers = min(n_workers or os.cpu_count() or 1, n_frames)
+        bounds = [n_frames * k // n_workers for k in range(n_workers + 1)]
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(render_frames, script_path, render_dir, start, stop, dpi)
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            n_rendered = sum(future.result() for future in futures)
+        print(f"Rendered {n_rendered} frames with {n_workers} workers")
+
+        if keep_frames:
+            if not frames_only:
+                print(f"{encoder} not found; frames written to {frame_dir}")
+            os.makedirs(frame_dir, exist_ok=True)
+            for name in sorted(os.listdir(render_dir)):
+                shutil.move(os.path.join(render_dir, name), os.path.join(frame_dir, name))
+            return frame_dir
+        encode_video(render_dir, output, fps, n_frames, encoder)
+        return output
+    finally:
+        shutil.rmtree(render_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an animated example to video without opening a window.")
+    parser.add_argument('script', help="example script, e.g. Example_A1.py")
+    parser.add_argument('output', help="video file, e.g. Example_A1.mp4 (frames go to <output>_frames/ without ffmpeg)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--dpi', type=int, default=100, help="frame resolution")
+    parser.add_argument('--fps', type=float, default=None, help="frame rate (default: from the animation interval)")
+    parser.add_argument('--frames-only', action='store_true', help="write PNG frames and skip encoding")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = export_animation(args.script, args.output, args.workers, args.dpi, args.fps, args.frames_only)
+    print(f"Exported {result} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
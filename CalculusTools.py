@@ -0,0 +1,42 @@
+"""
+CalculusTools.py
+Shared pieces of the calculus dashboards (Example_A1, Example_A2, Example_A3):
+the sigmoid-like function and its derivative, and tables of everything a
+frame shows (tangent lines and speedometer needle angles), computed once for
+the whole time grid so that a frame update is only a table lookup.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import numpy as np
+
+# Define a flat-start and flat-top sigmoid-like function and its derivative
+def func(t):
+    return 10 * (np.tanh((t - 5)/3) - np.tanh((t - 15)/3)) / 2 + 5
+
+def derivative(t):
+    return (10 / 6) * ((1 - np.tanh((t - 5)/3)**2) / 2 - (1 - np.tanh((t - 15)/3)**2) / 2)
+
+# Per-frame quantities for a time grid t, as arrays indexed by frame:
+#   y, dy: function and derivative values
+#   slope: tangent slope, the average slope from the previous point (the
+#     derivative at the first frame)
+#   tangent_y: (len(t), 2) heights of the tangent line at tangent_x
+#   needle_angle: speedometer angle, with zero slope vertical and the largest
+#     |derivative| on the grid at +-90 degrees
+class FrameTable:
+    def __init__(self, t, tangent_x=(0, 20)):
+        self.t = np.asarray(t, dtype=float)
+        self.y = func(self.t)
+        self.dy = derivative(self.t)
+        self.slope = np.empty_like(self.t)
+        self.slope[0] = self.dy[0]
+        self.slope[1:] = np.diff(self.y) / np.diff(self.t)
+        self.tangent_x = np.array(tangent_x, dtype=float)
+        self.tangent_y = self.slope[:, None] * (self.tangent_x - self.t[:, None]) + self.y[:, None]
+        self.needle_angle = np.pi / 2 - (self.dy / np.abs(self.dy).max()) * (np.pi / 2)
+
+    def __len__(self):
+        return len(self.t)
@@ -8,66 +8,117 @@ University of Texas at San Antonio.
 
 License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
 """
+import atexit
+import os
+import shutil
+import tempfile
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
-from sklearn.datasets import make_blobs
-from scipy.spatial.distance import pdist, squareform
+from ClusterTools import RadiusNeighbors, SingleLinkageHierarchy, get_blobs, iter_component_labels
+from DataTools import load_array
+from InteractiveTools import BackgroundWorker, LabeledScatter
+
+# Streaming mode: cluster a dataset too large for memory with the out-of-core
+# pipeline. Points are memory-mapped from stream_path (a .npy file) when given,
+# otherwise stream_samples points are written to a temporary .npy file block
+# by block. Distances are computed block_size rows at a time within about
+# max_memory bytes, on a background thread that gives up as soon as the
+# slider moves on; the plot shows a fixed random sample of display_size
+# points. Temporary files are deleted on exit.
+streaming = False
+stream_path = None
+stream_samples = 100_000
+block_size = 4096
+max_memory = 256 * 2**20
+display_size = 3000
 
 # Generate 2D points from multiple distributions
 n_samples = 300
 centers = [(-5, -5), (0, 0), (5, 5)]
-X, _ = make_blobs(n_samples=n_samples, centers=centers, cluster_std=1.0, random_state=42)
-
-# Function to perform simple distance-based clustering
-def cluster_by_distance(X, threshold):
-    distances = squareform(pdist(X))
-    n = len(X)
-    labels = -np.ones(n, dtype=int)
-    cluster_id = 0
-
-    for i in range(n):
-        if labels[i] == -1:
-            labels[i] = cluster_id
-            to_visit = [i]
-            while to_visit:
-                current = to_visit.pop()
-                neighbors = np.where((distances[current] < threshold) & (labels == -1))[0]
-                labels[neighbors] = cluster_id
-                to_visit.extend(neighbors.tolist())
-            cluster_id += 1
-    return labels
+
+# Slider range for the clustering threshold
+min_threshold, max_threshold = 0.1, 2.0
+
+# Write n_total blob points to a .npy file, one block at a time
+def write_blobs(path, n_total, block_size=65536, random_state=42):
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(n_total, 2))
+    rng = np.random.default_rng(random_state)
+    for start in range(0, n_total, block_size):
+        n = min(block_size, n_total - start)
+        out[start:start + n] = np.asarray(centers, dtype=float)[rng.integers(0, len(centers), size=n)] + rng.standard_normal((n, 2))
+    out.flush()
+    return path
+
+if streaming:
+    temp_dir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, temp_dir, ignore_errors=True)
+    if stream_path is None:
+        stream_path = write_blobs(os.path.join(temp_dir, 'blobs.npy'), stream_samples)
+    X_stream = load_array(stream_path)
+    sample_idx = np.sort(np.random.default_rng(0).choice(len(X_stream), min(display_size, len(X_stream)), replace=False))
+    X = np.asarray(X_stream[sample_idx], dtype=float)
+    labels_out = np.lib.format.open_memmap(os.path.join(temp_dir, 'labels.npy'), mode='w+',
+                                           dtype=np.int64, shape=(len(X_stream),))
+else:
+    X = get_blobs(n_samples, centers).sample(1.0).copy()
+
+    # Single-linkage hierarchy built once; every slider move only cuts it
+    index = RadiusNeighbors(X)
+    hierarchy = SingleLinkageHierarchy(X, max_threshold, index=index)
+
+# Out-of-core clustering for one threshold (on the background worker). Returns
+# the labels of the displayed sample, renumbered 0, 1, ... in order of first
+# appearance, and the number of clusters in the whole dataset; or None when a
+# newer threshold was requested meanwhile.
+def stream_clusters(threshold, cancelled=None):
+    n_clusters = 0
+    for _, _, labels in iter_component_labels(X_stream, threshold, block_size, max_memory, out=labels_out,
+                                              cancelled=cancelled):
+        n_clusters = max(n_clusters, labels.max() + 1)
+    if cancelled is not None and cancelled():
+        return None
+    sample_labels = np.asarray(labels_out[sample_idx])
+    _, first, inverse = np.unique(sample_labels, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[inverse], n_clusters
+
+def show_stream_clusters(threshold, result):
+    labels, n_clusters = result
+    renderer.update(labels, f"Threshold: {threshold:.2f} | Clusters: {n_clusters:,} | Showing {len(X):,} of {len(X_stream):,} points")
 
 # Plotting function
 def plot_clusters(threshold):
-    labels = cluster_by_distance(X, threshold)
-    n_clusters = len(set(labels))
-    ax_plot.cla()
-    for label in set(labels):
-        pts = X[labels == label]
-        ax_plot.scatter(pts[:, 0], pts[:, 1], label=f"Cluster {label}")
-    ax_plot.set_title(f"Threshold: {threshold:.2f} | Clusters: {n_clusters}")
-    ax_plot.legend()
-    ax_text.cla()
-    explanation = (
-        "This plot shows how changing the clustering threshold affects the grouping of points. "
-        "Clusters are formed by connecting points that are closer than the threshold distance. "
-        "As the threshold increases, more points are grouped together, reducing the number of clusters."
-    )
-    ax_text.text(0, 1, explanation, va='top', wrap=True, fontsize=18)
-    ax_text.axis('off')
-    fig.canvas.draw_idle()
+    if streaming:
+        renderer.blit.update()
+        worker.submit(round(threshold, 2))
+        return
+    labels = hierarchy.labels(threshold)
+    n_clusters = labels.max() + 1
+    renderer.update(labels, f"Threshold: {threshold:.2f} | Clusters: {n_clusters}")
 
 # Set up the figure and slider
 fig, (ax_plot, ax_text) = plt.subplots(1, 2, figsize=(12, 6))
 plt.subplots_adjust(bottom=0.25)
 
+# The points are drawn once; slider moves only recolor them
+renderer = LabeledScatter(ax_plot, X)
+explanation = (
+    "This plot shows how changing the clustering threshold affects the grouping of points. "
+    "Clusters are formed by connecting points that are closer than the threshold distance. "
+    "As the threshold increases, more points are grouped together, reducing the number of clusters."
+)
+ax_text.text(0, 1, explanation, va='top', wrap=True, fontsize=18)
+ax_text.axis('off')
+
 initial_threshold = 1.5
+if streaming:
+    worker = BackgroundWorker(fig.canvas, stream_clusters, show_stream_clusters)
 plot_clusters(initial_threshold)
 
 # Create slider in its own axis
 ax_slider = plt.axes([0.25, 0.05, 0.5, 0.03])
-slider = Slider(ax_slider, 'Threshold', 0.1, 2.0, valinit=initial_threshold)
+slider = Slider(ax_slider, 'Threshold', min_threshold, max_threshold, valinit=initial_threshold)
+renderer.attach_slider(slider)
 
 fig.canvas.manager.set_window_title('Naive Clustering')
 
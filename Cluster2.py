@@ -11,44 +11,103 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
-from sklearn.datasets import make_blobs
-from sklearn.cluster import KMeans
+from ClusterTools import KMeansCache, dataset_fingerprint, get_blobs, streaming_kmeans
+from DataTools import load_array, reservoir_sample
+from InteractiveTools import BackgroundWorker, LabeledScatter
+
+# Streaming mode: cluster a large stream of points with mini-batch K-Means.
+# Points are read from stream_path (a .npy file, memory-mapped) when given,
+# otherwise generated on the fly; only one batch is in memory at a time and
+# the plot shows a fixed-size random sample, recolored every update_every
+# batches as the fit converges.
+streaming = False
+stream_path = None
+stream_samples = 1_000_000
+batch_size = 10_000
+update_every = 10
+display_size = 3000
 
 # Generate 2D points from multiple distributions
 n_samples = 300
 centers = [(-5, -5), (0, 0), (5, 5)]
-X, _ = make_blobs(n_samples=n_samples, centers=centers, cluster_std=1.0, random_state=42)
+
+# Generator of blob batches, same distributions as the in-memory dataset
+def blob_batches(n_total, batch_size, random_state=42):
+    rng = np.random.default_rng(random_state)
+    for start in range(0, n_total, batch_size):
+        n = min(batch_size, n_total - start)
+        labels = rng.integers(0, len(centers), size=n)
+        yield np.asarray(centers, dtype=float)[labels] + rng.standard_normal((n, 2))
+
+# A fresh pass over the streamed data
+def stream_source():
+    if stream_path is not None:
+        return load_array(stream_path)
+    return blob_batches(stream_samples, batch_size)
+
+if streaming:
+    X = reservoir_sample(stream_source(), display_size, seed=0)
+else:
+    X = get_blobs(n_samples, centers).sample(1.0).copy()
+
+# Streaming fit for one k, on the background worker. The labels of the
+# displayed sample are reported every update_every batches while the fit
+# converges; returns the final labels, or None when a newer k was requested
+# meanwhile.
+def fit_stream(n_clusters, cancelled):
+    def report(kmeans, n_seen):
+        worker.report(n_clusters, (kmeans.predict(X), n_seen))
+    kmeans = streaming_kmeans(stream_source(), n_clusters, batch_size, update_every, callback=report,
+                              cancelled=cancelled)
+    return None if kmeans is None else kmeans.predict(X)
+
+def show_progress(n_clusters, progress):
+    labels, n_seen = progress
+    renderer.update(labels, f"Mini-Batch K-Means | Clusters: {n_clusters} | Points seen: {n_seen:,}")
+
+def show_stream(n_clusters, labels):
+    renderer.update(labels, f"Mini-Batch K-Means | Clusters: {n_clusters} | Showing {len(X):,} sampled points")
+
+if not streaming:
+    # Fitted models are cached per k, so returning to a k is instant
+    kmeans_cache = KMeansCache()
+    fingerprint = dataset_fingerprint(X)
 
 # Plotting function
 def plot_clusters(n_clusters):
-    kmeans = KMeans(n_clusters=n_clusters, random_state=0, n_init=10)
-    labels = kmeans.fit_predict(X)
-    ax_plot.cla()
-    for label in set(labels):
-        pts = X[labels == label]
-        ax_plot.scatter(pts[:, 0], pts[:, 1], label=f"Cluster {label}")
-    ax_plot.set_title(f"K-Means Clustering | Clusters: {n_clusters}")
-    ax_plot.legend()
-    ax_text.cla()
-    explanation = (
-        "This plot shows how changing the number of clusters in K-Means affects the grouping of points. "
-        "K-Means partitions the dataset into the specified number of clusters by minimizing intra-cluster variance. "
-        "As the number of clusters increases, the algorithm assigns points more locally."
-    )
-    ax_text.text(0, 1, explanation, va='top', wrap=True, fontsize=16)
-    ax_text.axis('off')
-    fig.canvas.draw_idle()
+    if streaming:
+        renderer.blit.update()
+        worker.submit(n_clusters)
+    else:
+        labels = kmeans_cache.fit(X, n_clusters, fingerprint).labels_
+        renderer.update(labels, f"K-Means Clustering | Clusters: {n_clusters}")
 
 # Set up the figure and slider
 fig, (ax_plot, ax_text) = plt.subplots(1, 2, figsize=(12, 6))
 plt.subplots_adjust(bottom=0.25)
 
+# The points are drawn once; slider moves only recolor them
+renderer = LabeledScatter(ax_plot, X)
+explanation = (
+    "This plot shows how changing the number of clusters in K-Means affects the grouping of points. "
+    "K-Means partitions the dataset into the specified number of clusters by minimizing intra-cluster variance. "
+    "As the number of clusters increases, the algorithm assigns points more locally."
+)
+ax_text.text(0, 1, explanation, va='top', wrap=True, fontsize=16)
+ax_text.axis('off')
+
+# In streaming mode each fit re-reads the whole stream, so it runs on a
+# background thread that reports its progress; the final labels of every
+# completed fit are kept per k, and only the latest k is drawn
 initial_clusters = 3
+if streaming:
+    worker = BackgroundWorker(fig.canvas, fit_stream, show_stream, on_progress=show_progress)
 plot_clusters(initial_clusters)
 
 # Create slider in its own axis
 ax_slider = plt.axes([0.25, 0.05, 0.5, 0.03])
 slider = Slider(ax_slider, 'Clusters', 1, 10, valinit=initial_clusters, valstep=1)
+renderer.attach_slider(slider)
 
 fig.canvas.manager.set_window_title('K-means Clustering')
 
@@ -0,0 +1,42 @@
+"""
+ClusterBenchmark.py
+Benchmark of the threshold clustering backends in ClusterTools: breadth-first
+search over a KD-tree versus connected components of a sparse radius graph.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import time
+import numpy as np
+from ClusterTools import RadiusNeighbors, cluster_by_distance
+
+# Benchmark parameters: uniform points in a square whose side grows with n,
+# so the average number of neighbors per point stays constant
+sizes = [1_000, 10_000, 100_000, 1_000_000]
+threshold = 1.0
+points_per_unit_area = 0.5
+repeats = 3
+
+# Best-of-repeats wall time of fn()
+def best_time(fn):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+rng = np.random.default_rng(42)
+print(f"{'n':>10} {'clusters':>10} {'bfs [s]':>10} {'sparse [s]':>11} {'speedup':>8}")
+for n in sizes:
+    side = np.sqrt(n / points_per_unit_area)
+    X = rng.uniform(0, side, size=(n, 2))
+    index = RadiusNeighbors(X)
+
+    t_bfs, labels_bfs = best_time(lambda: cluster_by_distance(X, threshold, index=index, backend='bfs'))
+    t_sparse, labels_sparse = best_time(lambda: cluster_by_distance(X, threshold, index=index, backend='sparse'))
+    assert np.array_equal(labels_bfs, labels_sparse)
+
+    print(f"{n:>10} {labels_bfs.max() + 1:>10} {t_bfs:>10.3f} {t_sparse:>11.3f} {t_bfs / t_sparse:>7.1f}x")
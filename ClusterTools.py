@@ -0,0 +1,469 @@
+"""
+ClusterTools.py
+Shared clustering engines used by the Cluster examples: threshold (distance)
+clustering backed by a spatial index instead of a dense distance matrix, and
+a precomputed single-linkage hierarchy for fast threshold changes, and an
+out-of-core pipeline for memory-mapped datasets. Also provides a memoized,
+warm-started K-Means for the Cluster2 slider and a streaming mini-batch
+K-Means for inputs of any size, a parallel silhouette sweep over k, and a
+cached blob dataset provider shared by the three Cluster scripts.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.datasets import make_blobs
+from sklearn.metrics import pairwise_distances, silhouette_score
+from threadpoolctl import threadpool_limits
+from DataTools import block_ranges, iter_chunks
+
+# Radius-neighbor engine: a KD-tree over the points answers "which points are
+# closer than the threshold" without ever building the n x n distance matrix.
+class RadiusNeighbors:
+    def __init__(self, X):
+        self.X = np.asarray(X, dtype=float)
+        self.tree = cKDTree(self.X)
+
+    def __len__(self):
+        return len(self.X)
+
+    # The tree tests distance <= r; shrinking r by one ulp keeps the strict
+    # "closer than the threshold" rule of the original clustering.
+    @staticmethod
+    def radius(threshold):
+        return np.nextafter(threshold, 0)
+
+    # Indices of all points closer than threshold to each point in idx
+    def query(self, idx, threshold):
+        hits = self.tree.query_ball_point(self.X[idx], self.radius(threshold))
+        if len(hits) == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([np.asarray(h, dtype=np.intp) for h in hits])
+
+    # All pairs (i, j), i < j, closer than threshold, as an (m, 2) array
+    def pairs(self, threshold):
+        return self.tree.query_pairs(self.radius(threshold), output_type='ndarray')
+
+    # Sparse (CSR) adjacency matrix of the radius graph at threshold
+    def graph(self, threshold):
+        pairs = self.pairs(threshold)
+        n = len(self)
+        return csr_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+
+# Function to perform simple distance-based clustering. Points closer than the
+# threshold are connected, and clusters are the connected groups of points.
+# Pass a prebuilt RadiusNeighbors index to reuse it across thresholds.
+# backend='bfs' grows each cluster with a breadth-first search over the index;
+# backend='sparse' builds the radius graph once as a CSR matrix and labels all
+# components in a single scipy.sparse.csgraph call.
+def cluster_by_distance(X, threshold, index=None, backend='bfs', batch_size=1024):
+    if index is None:
+        index = RadiusNeighbors(X)
+    if backend == 'sparse':
+        _, labels = connected_components(index.graph(threshold), directed=False)
+        return labels
+    if backend != 'bfs':
+        raise ValueError(f"unknown backend {backend!r}; expected 'bfs' or 'sparse'")
+    n = len(index)
+    labels = -np.ones(n, dtype=int)
+    cluster_id = 0
+
+    for i in range(n):
+        if labels[i] == -1:
+            labels[i] = cluster_id
+            to_visit = np.array([i], dtype=np.intp)
+            while to_visit.size:
+                # Expand the frontier in batches to keep neighbor lists bounded
+                current, to_visit = to_visit[:batch_size], to_visit[batch_size:]
+                neighbors = index.query(current, threshold)
+                neighbors = np.unique(neighbors[labels[neighbors] == -1])
+                labels[neighbors] = cluster_id
+                to_visit = np.concatenate((to_visit, neighbors))
+            cluster_id += 1
+    return labels
+
+# Pairs (i, j), i < j, closer than threshold, with their distances, in blocks
+# of consecutive points i holding at most about max_pairs pairs each (a single
+# point with more neighbors forms its own block). Neighbor counts are taken
+# first without listing the neighbors, then each block is a sparse distance
+# query between a KD-tree of the block and the full tree.
+def _radius_pair_blocks(index, threshold, max_pairs):
+    radius = index.radius(threshold)
+    ends = np.cumsum(index.tree.query_ball_point(index.X, radius, return_length=True))
+    start = 0
+    while start < len(index):
+        base = ends[start - 1] if start > 0 else 0
+        stop = max(start + 1, int(np.searchsorted(ends, base + max_pairs, side='right')))
+        block = cKDTree(index.X[start:stop]).sparse_distance_matrix(index.tree, radius, output_type='ndarray')
+        i = block['i'].astype(np.intp) + start
+        j = block['j'].astype(np.intp)
+        upper = i < j
+        yield i[upper], j[upper], block['v'][upper]
+        start = stop
+
+# Threshold clustering is a cut of the single-linkage tree: two points share a
+# cluster exactly when the minimum spanning tree joins them with edges shorter
+# than the threshold. The spanning forest of all pairs closer than
+# max_threshold is built once; each labels(threshold) call then only keeps the
+# edges below the threshold and relabels the components in linear time.
+# The pairs are never listed all at once (in dense data there are O(n^2) of
+# them): they are generated in blocks of at most max_pairs, and each block is
+# merged into the running forest, using MST(A + B) = MST(MST(A) + B). Memory
+# is O(n + max_pairs); time still grows with the total number of pairs.
+class SingleLinkageHierarchy:
+    def __init__(self, X, max_threshold, index=None, max_pairs=2**20):
+        if index is None:
+            index = RadiusNeighbors(X)
+        self.n = len(index)
+        self.max_threshold = max_threshold
+
+        rows = cols = np.empty(0, dtype=np.intp)
+        weights = np.empty(0)
+        for i, j, w in _radius_pair_blocks(index, max_threshold, max_pairs):
+            # csgraph treats explicit zeros as missing edges, so duplicate
+            # points get the smallest positive weight instead
+            graph = coo_matrix((np.concatenate((weights, np.maximum(w, np.finfo(float).tiny))),
+                                (np.concatenate((rows, i)), np.concatenate((cols, j)))), shape=(self.n, self.n))
+            forest = minimum_spanning_tree(graph).tocoo()
+            rows, cols, weights = forest.row, forest.col, forest.data
+
+        order = np.argsort(weights, kind='stable')
+        self.weights = weights[order]
+        self.rows = rows[order]
+        self.cols = cols[order]
+
+    # Cluster labels for a threshold, numbered in order of first appearance
+    def labels(self, threshold):
+        if threshold > self.max_threshold:
+            raise ValueError(f"threshold {threshold} exceeds max_threshold {self.max_threshold}")
+        k = np.searchsorted(self.weights, threshold, side='left')
+        graph = coo_matrix((np.ones(k), (self.rows[:k], self.cols[:k])), shape=(self.n, self.n))
+        _, labels = connected_components(graph, directed=False)
+        return labels
+
+# Follow parent pointers until every index in idx reaches its root
+def _find_roots(parent, idx):
+    roots = np.asarray(parent[idx])
+    while True:
+        up = np.asarray(parent[roots])
+        if np.array_equal(up, roots):
+            return roots
+        roots = up
+
+# Merge the components joined by the edges (a, b). Every root points to the
+# smallest index of its component, so parent[i] <= i always holds.
+def _union(parent, a, b):
+    ra = _find_roots(parent, a)
+    rb = _find_roots(parent, b)
+    keep = ra != rb
+    if not keep.any():
+        return
+    nodes, inverse = np.unique(np.concatenate((ra[keep], rb[keep])), return_inverse=True)
+    m = keep.sum()
+    graph = coo_matrix((np.ones(m), (inverse[:m], inverse[m:])), shape=(len(nodes), len(nodes)))
+    _, comp = connected_components(graph, directed=False)
+    new_root = np.full(comp.max() + 1, len(parent), dtype=np.int64)
+    np.minimum.at(new_root, comp, nodes)
+    parent[nodes] = new_root[comp]
+
+# Bytes per matched pair in the union step: the two int64 index arrays of
+# np.nonzero, their filtered copies, the roots found for both ends and the
+# temporaries of _find_roots and np.unique in _union
+_PAIR_BYTES = 128
+
+# Split max_memory between the distance block (8 bytes per distance plus 1
+# per mask entry) and the matched pairs of the union step, half each. Returns
+# the block size and the largest number of pairs handled at once.
+def _block_size_for(block_size, max_memory):
+    block_size = max(1, min(block_size, int(np.sqrt(max_memory / 2 / 9))))
+    max_pairs = max(block_size, int(max_memory / 2 / _PAIR_BYTES))
+    return block_size, max_pairs
+
+# Row ranges of a boolean mask holding at most max_pairs True entries each
+# (a single row with more forms its own range)
+def _row_ranges(mask, max_pairs):
+    ends = np.cumsum(np.count_nonzero(mask, axis=1))
+    start = 0
+    while start < len(mask):
+        base = ends[start - 1] if start > 0 else 0
+        stop = max(start + 1, int(np.searchsorted(ends, base + max_pairs, side='right')))
+        yield start, stop
+        start = stop
+
+# Out-of-core threshold clustering. X may be an np.memmap (see
+# DataTools.load_array); it is read block by block and distances are only
+# ever computed for one pair of blocks at a time. Labels are written into out,
+# which can itself be a memmap, and the final labels are yielded block by
+# block as (start, stop, labels) as soon as each block is resolved. Labels are
+# numbered in order of first appearance, as in cluster_by_distance. Working
+# memory (besides X and out) stays near max_memory: the distance block and
+# the matched pairs, which are merged a few rows of the block at a time, each
+# get half of it. cancelled() is polled before each pair of blocks; once it
+# returns True the generator stops without yielding any labels (out is then
+# left partly filled).
+def iter_component_labels(X, threshold, block_size=4096, max_memory=256 * 2**20, out=None, cancelled=None):
+    n = len(X)
+    block_size, max_pairs = _block_size_for(block_size, max_memory)
+    parent = np.empty(n, dtype=np.int64) if out is None else out
+    for start, stop in block_ranges(n, block_size):
+        parent[start:stop] = np.arange(start, stop)
+
+    # Union-find over every pair of blocks (i <= j)
+    for i0, i1 in block_ranges(n, block_size):
+        Xi = np.asarray(X[i0:i1], dtype=float)
+        for j0, j1 in block_ranges(n, block_size):
+            if j1 <= i0:
+                continue
+            if cancelled is not None and cancelled():
+                return
+            Xj = np.asarray(X[j0:j1], dtype=float)
+            close = cdist(Xi, Xj) < threshold
+            for r0, r1 in _row_ranges(close, max_pairs):
+                a, b = np.nonzero(close[r0:r1])
+                a += i0 + r0
+                b += j0
+                upper = a < b
+                _union(parent, a[upper], b[upper])
+            del close
+
+    # Point every index straight at its root. Blocks are visited in order, so
+    # the earlier indices that the pointers lead to are already compressed.
+    for start, stop in block_ranges(n, block_size):
+        parent[start:stop] = _find_roots(parent, np.arange(start, stop))
+
+    # Relabel in index order. Roots are the first point of their component,
+    # so a root's label is the number of roots before it, and every other
+    # point copies the label already written at its (earlier) root.
+    n_roots = 0
+    for start, stop in block_ranges(n, block_size):
+        roots = np.asarray(parent[start:stop])
+        is_root = roots == np.arange(start, stop)
+        labels = np.empty(stop - start, dtype=np.int64)
+        labels[is_root] = n_roots + np.arange(is_root.sum())
+        n_roots += is_root.sum()
+        parent[start + np.flatnonzero(is_root)] = labels[is_root]
+        labels[~is_root] = np.asarray(parent[roots[~is_root]])
+        parent[start:stop] = labels
+        yield start, stop, labels
+
+# Out-of-core counterpart of cluster_by_distance; returns the filled labels
+def chunked_cluster_by_distance(X, threshold, block_size=4096, max_memory=256 * 2**20, out=None):
+    if out is None:
+        out = np.empty(len(X), dtype=np.int64)
+    for _ in iter_component_labels(X, threshold, block_size, max_memory, out):
+        pass
+    return out
+
+# Content hash identifying a dataset, used as part of cache keys
+def dataset_fingerprint(X):
+    X = np.ascontiguousarray(X)
+    digest = hashlib.sha1(f"{X.shape}{X.dtype}".encode())
+    digest.update(X.view(np.uint8).ravel())
+    return digest.hexdigest()
+
+# Initial centers for k + 1 clusters from a k-cluster fit: the centroid of the
+# largest cluster (by within-cluster sum of squares) is split in two, one
+# standard deviation either side of it along that cluster's principal axis
+def split_largest_cluster(X, labels, centers):
+    sse = np.bincount(labels, weights=((X - centers[labels]) ** 2).sum(axis=1), minlength=len(centers))
+    largest = sse.argmax()
+    centered = X[labels == largest] - centers[largest]
+    _, s, vt = np.linalg.svd(centered, full_matrices=False)
+    offset = vt[0] * s[0] / np.sqrt(max(len(centered), 1))
+    init = np.vstack((centers, centers[largest] + offset))
+    init[largest] = centers[largest] - offset
+    return init
+
+# LRU cache of fitted K-Means models keyed by (dataset fingerprint, k).
+# Revisiting a k returns the stored model; a new k is warm-started from the
+# cached k - 1 model when there is one, and fitted from scratch otherwise.
+class KMeansCache:
+    def __init__(self, maxsize=32, random_state=0, n_init=10):
+        self.maxsize = maxsize
+        self.random_state = random_state
+        self.n_init = n_init
+        self._models = OrderedDict()
+
+    def fit(self, X, n_clusters, fingerprint=None):
+        if fingerprint is None:
+            fingerprint = dataset_fingerprint(X)
+        key = (fingerprint, n_clusters)
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key]
+
+        previous = self._models.get((fingerprint, n_clusters - 1))
+        if previous is not None:
+            init = split_largest_cluster(X, previous.labels_, previous.cluster_centers_)
+            kmeans = KMeans(n_clusters=n_clusters, init=init, n_init=1, random_state=self.random_state)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=self.random_state, n_init=self.n_init)
+        kmeans.fit(X)
+
+        self._models[key] = kmeans
+        if len(self._models) > self.maxsize:
+            self._models.popitem(last=False)
+        return kmeans
+
+# Mini-batch K-Means over a stream. source is an array, a memmap or a
+# generator of arrays; it is consumed in batches through partial_fit, so
+# memory stays bounded by batch_size whatever the input size. Every
+# update_every batches (and once at the end) callback(model, n_seen) is called
+# so a plot can follow the fit as it converges. The fit stops and returns None
+# as soon as cancelled() returns True (see InteractiveTools.BackgroundWorker).
+def streaming_kmeans(source, n_clusters, batch_size=10_000, update_every=10, callback=None, random_state=0,
+                     cancelled=None):
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state, n_init=3)
+    n_seen = 0
+    for i, batch in enumerate(iter_chunks(source, batch_size)):
+        if cancelled is not None and cancelled():
+            return None
+        kmeans.partial_fit(batch)
+        n_seen += len(batch)
+        if callback is not None and (i + 1) % update_every == 0:
+            callback(kmeans, n_seen)
+    if callback is not None:
+        callback(kmeans, n_seen)
+    return kmeans
+
+# Silhouette values of the rows in idx, from their distances to every point.
+# Distances to all n points are computed for as many rows at a time as fit in
+# max_memory (8 bytes per distance) and summed per cluster.
+def _silhouette_samples(X, labels, idx, max_memory=256 * 2**20):
+    block_size = max(1, int(max_memory / (8 * len(X))))
+    n_clusters = labels.max() + 1
+    counts = np.bincount(labels, minlength=n_clusters)
+    onehot = csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), labels)), shape=(len(labels), n_clusters))
+    s = np.empty(len(idx))
+    for start, stop in block_ranges(len(idx), block_size):
+        rows = idx[start:stop]
+        sums = np.asarray((onehot.T @ cdist(X, X[rows])).T)
+        own = labels[rows]
+        a = sums[np.arange(len(rows)), own] / np.maximum(counts[own] - 1, 1)
+        means = sums / counts
+        means[np.arange(len(rows)), own] = np.inf
+        b = means.min(axis=1)
+        s[start:stop] = np.where(counts[own] > 1, (b - a) / np.maximum(a, b), 0)
+    return s
+
+# Silhouette score with an error bound, returned as (score, error).
+# mode='exact' is scikit-learn's silhouette_score; pass a precomputed distance
+# matrix D to reuse it across several labelings. mode='sampled' averages the
+# silhouette of a sample stratified by cluster (each cluster contributes in
+# proportion to its size) and returns the half-width of the confidence
+# interval of that stratified estimate (1.96 standard errors, with the
+# finite-population correction) as the error. The sampled silhouette keeps
+# its distance blocks within about max_memory bytes.
+def silhouette(X, labels, mode='exact', D=None, sample_size=2000, confidence=1.96, random_state=0,
+               max_memory=256 * 2**20):
+    if mode == 'exact':
+        if D is not None:
+            return silhouette_score(D, labels, metric='precomputed'), 0.0
+        return silhouette_score(X, labels), 0.0
+    if mode != 'sampled':
+        raise ValueError(f"unknown mode {mode!r}; expected 'exact' or 'sampled'")
+
+    rng = np.random.default_rng(random_state)
+    n = len(labels)
+    counts = np.bincount(labels)
+    n_strata = np.minimum(counts, np.maximum(1, np.round(sample_size * counts / n).astype(int)))
+    strata = [rng.choice(np.flatnonzero(labels == c), n_strata[c], replace=False) for c in range(len(counts))]
+    s = _silhouette_samples(X, labels, np.concatenate(strata), max_memory)
+
+    score, variance = 0.0, 0.0
+    bounds = np.cumsum(np.concatenate(([0], n_strata)))
+    for c in range(len(counts)):
+        s_c = s[bounds[c]:bounds[c + 1]]
+        weight = counts[c] / n
+        score += weight * s_c.mean()
+        if n_strata[c] > 1:
+            variance += weight ** 2 * (1 - n_strata[c] / counts[c]) * s_c.var(ddof=1) / n_strata[c]
+    return score, confidence * np.sqrt(variance)
+
+# Function to find the optimal number of clusters using silhouette score.
+# The fits for k = 2..max_k are independent, so they run on a pool of
+# n_workers threads (scikit-learn releases the GIL while fitting), with the
+# BLAS/OpenMP threads of each fit limited so the pool does not oversubscribe
+# the cores. cancelled() is polled before each fit and as fits finish; once
+# it returns True the pending fits are dropped and None is returned.
+# Up to exact_max_samples points the pairwise distances are computed once and
+# shared by every k; above that the sampled silhouette is used. Returns
+# (best_k, labels, scores), where scores maps every k to the (score, error)
+# pair of silhouette(): the error is 0 for exact scores and the confidence
+# half-width for sampled ones, so a best k that is not clearly ahead of its
+# neighbors can be recognized. The sampled silhouettes running at once share
+# max_memory, each getting max_memory / n_workers.
+def optimal_kmeans(X, max_k=10, n_workers=None, cancelled=None, exact_max_samples=5000, sample_size=2000,
+                   max_memory=256 * 2**20):
+    ks = list(range(2, max_k + 1))
+    if n_workers is None:
+        n_workers = min(len(ks), os.cpu_count() or 1)
+    is_cancelled = cancelled if cancelled is not None else (lambda: False)
+    exact = len(X) <= exact_max_samples
+    D = pairwise_distances(X) if exact else None
+
+    def fit_and_score(k):
+        if is_cancelled():
+            return k, None, None
+        labels = KMeans(n_clusters=k, random_state=0, n_init=10).fit_predict(X)
+        if exact:
+            score = silhouette(X, labels, 'exact', D=D)
+        else:
+            score = silhouette(X, labels, 'sampled', sample_size=sample_size, max_memory=max_memory / n_workers)
+        return k, score, labels
+
+    results = {}
+    with threadpool_limits(limits=max(1, (os.cpu_count() or 1) // n_workers)):
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(fit_and_score, k) for k in ks]
+            for future in as_completed(futures):
+                if is_cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    return None
+                k, score, labels = future.result()
+                results[k] = (score, labels)
+
+    # Smallest k with the highest score, as in a sequential sweep
+    best_k = max(ks, key=lambda k: (results[k][0][0], -k))
+    return best_k, results[best_k][1], {k: results[k][0] for k in ks}
+
+# Blob datasets whose spread can change without new random draws.
+# make_blobs returns center + std * noise with unit-variance noise that does
+# not depend on std, so the noise is drawn once (with make_blobs itself, so
+# the points match it) and sample(std) only rescales it into a preallocated
+# buffer. Pass out= to sample into a buffer owned by the caller, e.g. one per
+# thread.
+class BlobProvider:
+    def __init__(self, n_samples, centers, random_state=42):
+        X, self.labels = make_blobs(n_samples=n_samples, centers=centers, cluster_std=1.0, random_state=random_state)
+        self.offsets = np.asarray(centers, dtype=float)[self.labels]
+        self.noise = X - self.offsets
+        self.buffer = np.empty_like(X)
+
+    def sample(self, std, out=None):
+        if out is None:
+            out = self.buffer
+        np.multiply(self.noise, std, out=out)
+        out += self.offsets
+        return out
+
+_blob_providers = {}
+
+# Shared BlobProvider per (n_samples, centers, random_state)
+def get_blobs(n_samples, centers, random_state=42):
+    key = (n_samples, tuple(map(tuple, centers)), random_state)
+    if key not in _blob_providers:
+        _blob_providers[key] = BlobProvider(n_samples, centers, random_state)
+    return _blob_providers[key]
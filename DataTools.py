@@ -0,0 +1,74 @@
+"""
+DataTools.py
+Helpers for working with datasets that do not fit in memory: memory-mapped
+loading of .npy files, iteration over fixed-size blocks of rows, and
+reservoir sampling of streams.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import numpy as np
+
+# Open a .npy file as a read-only np.memmap; rows are read from disk on demand
+def load_array(path):
+    return np.load(path, mmap_mode='r')
+
+# (start, stop) pairs covering range(n) in blocks of block_size rows
+def block_ranges(n, block_size):
+    for start in range(0, n, block_size):
+        yield start, min(start + block_size, n)
+
+# Rows per chunk so that one chunk of an (n, d) float64 source stays under
+# max_bytes; sources without a shape (generators) keep their own chunking
+def default_chunk_size(source, max_bytes=16 * 2**20):
+    shape = getattr(source, 'shape', None)
+    if shape is None or len(shape) < 2:
+        return 65536
+    return max(1, max_bytes // (8 * int(np.prod(shape[1:]))))
+
+# Iterate over a data source in chunks of rows. Arrays and memmaps are sliced
+# into chunk_size blocks (only one block is in memory at a time); any other
+# iterable, such as a generator of arrays, is passed through unchanged.
+def iter_chunks(source, chunk_size):
+    if hasattr(source, '__getitem__') and hasattr(source, '__len__'):
+        for start, stop in block_ranges(len(source), chunk_size):
+            yield np.asarray(source[start:stop])
+    else:
+        for chunk in source:
+            yield np.asarray(chunk)
+
+# Uniform random sample of a fixed number of rows from a stream of chunks of
+# unknown length (Algorithm R, vectorized per chunk). Memory is bounded by size.
+class ReservoirSample:
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.sample = None
+        self.n_seen = 0
+
+    def add(self, chunk):
+        chunk = np.asarray(chunk)
+        if self.sample is None:
+            self.sample = np.empty((self.size,) + chunk.shape[1:], dtype=chunk.dtype)
+        # Fill the reservoir first
+        n_fill = min(max(self.size - self.n_seen, 0), len(chunk))
+        self.sample[self.n_seen:self.n_seen + n_fill] = chunk[:n_fill]
+        # Then row t replaces a random slot with probability size / (t + 1)
+        rest = chunk[n_fill:]
+        t = self.n_seen + n_fill + np.arange(len(rest))
+        slots = self.rng.integers(0, t + 1)
+        keep = slots < self.size
+        self.sample[slots[keep]] = rest[keep]
+        self.n_seen += len(chunk)
+
+    def result(self):
+        return self.sample[:min(self.size, self.n_seen)]
+
+# Reservoir sample of size rows from an array, memmap or generator of chunks
+def reservoir_sample(source, size, chunk_size=65536, seed=None):
+    reservoir = ReservoirSample(size, seed)
+    for chunk in iter_chunks(source, chunk_size):
+        reservoir.add(chunk)
+    return reservoir.result()
@@ -11,6 +11,7 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from InteractiveTools import HorizontalBars
 
 np.random.seed(2025)
 
@@ -30,9 +31,9 @@ plt.subplots_adjust(wspace=0.4)
 ax1.set_title("y_actual vs y_desired")
 ax2.set_title("Error over Iterations")
 
-# Initialize bar plots for y_actual and y_desired
-bars_actual = ax1.barh(range(n), np.zeros(n), color='blue', label='y_actual')
-bars_desired = ax1.barh(range(n), y_desired.flatten(), color='orange', alpha=0.5, label='y_desired')
+# Initialize bar plots for y_actual and y_desired (one artist per series)
+bars_actual = HorizontalBars(ax1, np.zeros(n), color='blue', label='y_actual')
+bars_desired = HorizontalBars(ax1, y_desired.flatten(), color='orange', alpha=0.5, label='y_desired')
 ax1.set_xlim(0, 1)
 ax1.set_ylim(-0.5, n - 0.5)
 ax1.invert_yaxis()
@@ -56,10 +57,13 @@ def update(frame):
     gradient_W = -2 * (y_desired - y_actual) @ x.T
     W = W - alpha * gradient_W
 
-    for i, bar in enumerate(bars_actual):
-        bar.set_width(y_actual[i, 0])
+    bars_actual.set_widths(y_actual[:, 0])
     error_line.set_data(range(len(error_values)), error_values)
-    return [*bars_actual, error_line]
+    return [bars_actual.collection, error_line]
 
-ani = animation.FuncAnimation(fig, update, frames=num_iterations, blit=True, interval=100)
-plt.show()
+# Animation settings, also read by AnimationExport.py for headless export
+animation_kwargs = dict(func=update, frames=num_iterations, interval=100)
+
+if __name__ == "__main__":
+    ani = animation.FuncAnimation(fig, **animation_kwargs, blit=True)
+    plt.show()
@@ -12,6 +12,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.widgets import Slider
+from LinearMapTools import LinearMapTrajectory, MiniBatchTrainer
+from DataTools import load_array
+from InteractiveTools import BackgroundWorker, HorizontalBars
 
 np.random.seed(2025)
 
@@ -22,18 +25,60 @@ W = np.random.rand(n, n)
 alpha = 0.01
 num_iterations = 100
 
-# Precompute all iterations for slider control
-Ws = [W.copy()]
-y_actuals = [W @ x]
-errors = [np.mean((y_desired - Ws[-1] @ x) ** 2)]
+# Streaming mode: learn W from a stream of (x, y) samples with mini-batch
+# gradient descent instead of from the single pair above. Set stream_paths to
+# two .npy files of rows (x and y, both n wide) to train from disk; otherwise
+# a synthetic stream y = W_true x is generated. The first sample is displayed.
+# Training runs on a background thread; the error plot and the slider range
+# grow with every checkpoint while it runs.
+streaming = False
+stream_paths = None
+stream_samples = 1_000_000
+batch_size = 256
+sample_every = 100
 
-for _ in range(num_iterations):
-    y_actual = Ws[-1] @ x
-    gradient_W = -2 * (y_desired - y_actual) @ x.T
-    W_new = Ws[-1] - alpha * gradient_W
-    Ws.append(W_new)
-    y_actuals.append(W_new @ x)
-    errors.append(np.mean((y_desired - W_new @ x) ** 2))
+# Synthetic stream, generated chunk by chunk so it is never held in memory
+def synthetic_stream(n_samples, chunk_size=65536, seed=0):
+    rng = np.random.default_rng(seed)
+    W_true = rng.random((n, n)) / n
+    for start in range(0, n_samples, chunk_size):
+        x_chunk = rng.random((min(chunk_size, n_samples - start), n))
+        yield x_chunk, x_chunk @ W_true.T
+
+if streaming:
+    if stream_paths is not None:
+        X_stream, Y_stream = (load_array(path) for path in stream_paths)
+        x, y_desired = np.array(X_stream[:1].T), np.array(Y_stream[:1].T)
+        source = (X_stream, Y_stream)
+    else:
+        x_chunk, y_chunk = next(synthetic_stream(1))
+        x, y_desired = x_chunk.T, y_chunk.T
+        source = (synthetic_stream(stream_samples),)
+
+    # W is recorded every sample_every batches; the slider moves over these
+    # checkpoints, so memory grows with the checkpoints, not with the data.
+    # The first error is that of the initial W on the displayed sample.
+    # Checkpoints are appended on the worker thread (W before its error, so
+    # every plotted error has its W) and read on the GUI thread.
+    snapshots = [W.copy()]
+    errors = [np.mean((y_desired - W @ x) ** 2)]
+    def record(trainer, n_seen, error):
+        snapshots.append(trainer.W.copy())
+        errors.append(error)
+        worker.report('train', n_seen)
+
+    def train(key, cancelled):
+        trainer = MiniBatchTrainer(W, alpha, batch_size, sample_every, callback=record)
+        return trainer.fit(*source)
+
+    num_iterations = 1
+    W_at = snapshots.__getitem__
+else:
+    # Gradient-descent trajectory for slider control; any iteration is evaluated
+    # in closed form, so memory does not grow with num_iterations
+    trajectory = LinearMapTrajectory(W, x, y_desired, alpha)
+    errors = trajectory.errors(num_iterations)
+    W_at = trajectory.W
 
 fig = plt.figure(figsize=(15, 6))
 gs = fig.add_gridspec(2, 3, height_ratios=[15, 1])
@@ -46,35 +91,58 @@ ax0.set_title("Matrix and Vectors")
 ax1.set_title("y_actual vs y_desired")
 ax2.set_title("Error over Iterations")
 
-matrix_display = ax0.imshow(Ws[0], aspect='auto', cmap='viridis', vmin=0, vmax=1)
+matrix_display = ax0.imshow(W_at(0), aspect='auto', cmap='viridis', vmin=0, vmax=1)
 x_display = ax0.imshow(x.reshape(-1, 1), extent=[-2, -1, 0, n], aspect='auto', cmap='gray', vmin=0, vmax=1)
-y_display = ax0.imshow(y_actuals[0].reshape(-1, 1), extent=[n + 1, n + 2, 0, n], aspect='auto', cmap='Reds', vmin=0, vmax=1)
+y_display = ax0.imshow((W_at(0) @ x).reshape(-1, 1), extent=[n + 1, n + 2, 0, n], aspect='auto', cmap='Reds', vmin=0, vmax=1)
 
-bars_actual = ax1.barh(range(n), y_actuals[0].flatten(), color='blue', label='y_actual')
-bars_desired = ax1.barh(range(n), y_desired.flatten(), color='orange', alpha=0.5, label='y_desired')
+bars_actual = HorizontalBars(ax1, (W_at(0) @ x).flatten(), color='blue', label='y_actual')
+bars_desired = HorizontalBars(ax1, y_desired.flatten(), color='orange', alpha=0.5, label='y_desired')
 ax1.set_xlim(0, 1)
 ax1.set_ylim(-0.5, n - 0.5)
 ax1.invert_yaxis()
 ax1.legend()
 
-error_line, = ax2.plot(range(num_iterations + 1), errors, 'r-')
+error_line, = ax2.plot(range(len(errors)), errors, 'r-')
 current_iter_line = ax2.axvline(0, color='black', linestyle='--')
 ax2.set_xlim(0, num_iterations)
 ax2.set_ylim(0, 0.25)
-ax2.set_xlabel("Iteration")
+ax2.set_xlabel(f"Checkpoint (every {sample_every} batches)" if streaming else "Iteration")
 ax2.set_ylabel("Mean Squared Error")
 
 slider = Slider(slider_ax, 'Iteration', 0, num_iterations, valinit=0, valstep=1)
 
 def update(val):
     idx = int(slider.val)
-    for i, bar in enumerate(bars_actual):
-        bar.set_width(y_actuals[idx][i, 0])
-    matrix_display.set_data(Ws[idx])
-    y_display.set_data(y_actuals[idx].reshape(-1, 1))
+    W_idx = W_at(idx)
+    y_actual = W_idx @ x
+    bars_actual.set_widths(y_actual[:, 0])
+    matrix_display.set_data(W_idx)
+    y_display.set_data(y_actual.reshape(-1, 1))
     current_iter_line.set_xdata([idx, idx])
     fig.canvas.draw_idle()
 
 slider.on_changed(update)
+
+# Extend the error curve and the slider over the checkpoints recorded so far
+def show_checkpoints(status):
+    k = len(errors) - 1
+    error_line.set_data(range(k + 1), errors[:k + 1])
+    ax2.set_xlim(0, max(k, 1))
+    slider.valmax = max(k, 1)
+    slider.ax.set_xlim(slider.valmin, slider.valmax)
+    ax2.set_title(f"Error over Iterations ({status})")
+    fig.canvas.draw_idle()
+
+def show_progress(key, n_seen):
+    show_checkpoints(f"training, {n_seen:,} samples seen")
+
+def show_trained(key, trainer):
+    print(f"Trained on {trainer.n_seen:,} samples in {trainer.n_batches:,} batches")
+    show_checkpoints(f"trained on {trainer.n_seen:,} samples")
+
+if streaming:
+    worker = BackgroundWorker(fig.canvas, train, show_trained, delay=0.0, on_progress=show_progress)
+    worker.submit('train')
+
 plt.tight_layout()
 plt.show()
@@ -11,18 +11,14 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import numpy as np
+from CalculusTools import FrameTable
 
-# Define a flat-start and flat-top sigmoid-like function and its derivative
-def func(t):
-    return 10 * (np.tanh((t - 5)/3) - np.tanh((t - 15)/3)) / 2 + 5
-
-def derivative(t):
-    return (10 / 6) * ((1 - np.tanh((t - 5)/3)**2) / 2 - (1 - np.tanh((t - 15)/3)**2) / 2)
-
-# Time values
+# Time values; tangents, slopes and needle angles of every frame are
+# precomputed, so frame updates are table lookups
 t = np.linspace(0, 20, 400)
-y = func(t)
-dy = derivative(t)
+frames = FrameTable(t)
+y = frames.y
+dy = frames.dy
 
 # Set up the figure and axes
 fig = plt.figure(figsize=(12, 5))
@@ -53,34 +49,16 @@ def init():
 
 # Animation function
 def animate(i):
-    t_val = t[:i]
-    y_val = y[:i]
-    line.set_data(t_val, y_val)
-
-    max_abs_dy = max(abs(dy))
-    angle = (derivative(t[i]) / max_abs_dy) * (np.pi / 2)
-    angle = np.pi / 2 - angle  # rotate so zero is vertical
-    needle.set_data([0, angle], [0, 1])
-
-    # Compute tangent line using average slope from 2 neighboring points
-    if i >= 1:
-        t1, t2 = t[i - 1], t[i]
-        y1, y2 = y[i - 1], y[i]
-        slope = (y2 - y1) / (t2 - t1)
-    else:
-        slope = dy[i]  # fallback for first frame
-
-    t_curr = t[i]
-    y_curr = y[i]
-    t_tangent = np.array([0, 20])
-    y_tangent = slope * (t_tangent - t_curr) + y_curr
-    tangent_line.set_data(t_tangent, y_tangent)
-
+    line.set_data(t[:i], y[:i])
+    needle.set_data([0, frames.needle_angle[i]], [0, 1])
+    tangent_line.set_data(frames.tangent_x, frames.tangent_y[i])
     return line, needle, tangent_line
 
-# Create the animation
-ani = animation.FuncAnimation(fig, animate, init_func=init, frames=len(t),
-                              interval=50, blit=True)
-
+# Animation settings, also read by AnimationExport.py for headless export
+animation_kwargs = dict(func=animate, init_func=init, frames=len(t), interval=50)
 plt.tight_layout()
-plt.show()
\ No newline at end of file
+
+# Create the animation
+if __name__ == "__main__":
+    ani = animation.FuncAnimation(fig, **animation_kwargs, blit=True)
+    plt.show()
\ No newline at end of file
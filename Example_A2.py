@@ -11,18 +11,15 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
 import numpy as np
+from CalculusTools import FrameTable
+from InteractiveTools import BlitManager
 
-# Define a flat-start and flat-top sigmoid-like function and its derivative
-def func(t):
-    return 10 * (np.tanh((t - 5)/3) - np.tanh((t - 15)/3)) / 2 + 5
-
-def derivative(t):
-    return (10 / 6) * ((1 - np.tanh((t - 5)/3)**2) / 2 - (1 - np.tanh((t - 15)/3)**2) / 2)
-
-# Time values
+# Time values; tangents, slopes and needle angles of every frame are
+# precomputed, so frame updates are table lookups
 t = np.linspace(0, 20, 400)
-y = func(t)
-dy = derivative(t)
+frames = FrameTable(t)
+y = frames.y
+dy = frames.dy
 
 # Set up the figure and axes
 fig = plt.figure(figsize=(12, 6))
@@ -41,7 +38,7 @@ ax1.grid(True)
 # Right panel: Derivative plot
 deriv_line, = ax2.plot([], [], 'r--', lw=1)
 ax2.set_xlim(0, 20)
-ax2.set_ylim(min(dy) - 0.5, max(dy) + 0.5)
+ax2.set_ylim(dy.min() - 0.5, dy.max() + 0.5)
 ax2.set_title("Derivative of Function")
 ax2.grid(True)
 
@@ -49,30 +46,18 @@ ax2.grid(True)
 ax_slider = plt.axes([0.25, 0.05, 0.5, 0.03])
 frame_slider = Slider(ax_slider, 'Frame', 0, len(t) - 1, valinit=0, valstep=1)
 
+# Only the moving lines and the slider are redrawn on a slider move
+# (blitting) instead of the whole figure
+blit = BlitManager(fig.canvas, [line, tangent_line, deriv_line])
+blit.add_slider(frame_slider)
+
 # Update function for slider
 def update(val):
     i = int(frame_slider.val)
-    t_val = t[:i]
-    y_val = y[:i]
-    dy_val = dy[:i]
-
-    line.set_data(t_val, y_val)
-    deriv_line.set_data(t_val, dy_val)
-
-    if i >= 1:
-        t1, t2 = t[i - 1], t[i]
-        y1, y2 = y[i - 1], y[i]
-        slope = (y2 - y1) / (t2 - t1)
-    else:
-        slope = dy[i]
-
-    t_curr = t[i]
-    y_curr = y[i]
-    t_tangent = np.array([0, 20])
-    y_tangent = slope * (t_tangent - t_curr) + y_curr
-    tangent_line.set_data(t_tangent, y_tangent)
-
-    fig.canvas.draw_idle()
+    line.set_data(t[:i], y[:i])
+    deriv_line.set_data(t[:i], dy[:i])
+    tangent_line.set_data(frames.tangent_x, frames.tangent_y[i])
+    blit.update()
 
 frame_slider.on_changed(update)
 update(0)
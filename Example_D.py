@@ -12,11 +12,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.widgets import Slider
+from LinearMapTools import LinearMapTrajectory
+from InteractiveTools import BackgroundWorker
 
 np.random.seed(2025)
 
 n = 10
 m = 1
+max_n = 200
 alpha = 0.01
 num_iterations = 200
 
@@ -26,54 +29,40 @@ slider_n_ax = plt.axes([0.1, 0.02, 0.35, 0.03])
 slider_m_ax = plt.axes([0.55, 0.02, 0.35, 0.03])
 slider_iter_ax = plt.axes([0.1, 0.06, 0.8, 0.03])
 
-slider_n = Slider(slider_n_ax, 'n', 1, 50, valinit=n, valstep=1)
+slider_n = Slider(slider_n_ax, 'n', 1, max_n, valinit=n, valstep=1)
 slider_m = Slider(slider_m_ax, 'm', 1, 10, valinit=m, valstep=1)
 slider_iter = Slider(slider_iter_ax, 'Iteration', 0, num_iterations, valinit=0, valstep=1)
 
-x = np.random.rand(n, m)
-y_desired = np.random.rand(n, m)
-W = np.random.rand(n, n)
-
-Ws = [W.copy()]
-y_actuals = [W @ x]
-errors = [np.mean((y_desired - Ws[-1] @ x) ** 2)]
-
-for _ in range(num_iterations):
-    y_actual = Ws[-1] @ x
-    gradient_W = -2 * (y_desired - y_actual) @ x.T
-    W_new = Ws[-1] - alpha * gradient_W
-    Ws.append(W_new)
-    y_actuals.append(W_new @ x)
-    errors.append(np.mean((y_desired - W_new @ x) ** 2))
-
-axes_to_clear = []
-
-def make_axes(n, m):
-    global axes_to_clear
-    for ax in axes_to_clear:
-        ax.remove()
-    gs = fig.add_gridspec(2, 5, height_ratios=[15, 1])
-    ax_ydesired = fig.add_subplot(gs[0, 0])
-    ax_yactual = fig.add_subplot(gs[0, 1])
-    ax_matrix = fig.add_subplot(gs[0, 2])
-    ax_x = fig.add_subplot(gs[0, 3])
-    ax_error = fig.add_subplot(gs[0, 4])
-    
-    # Hide axes of the first four panels
-    ax_ydesired.axis('off')
-    ax_yactual.axis('off')
-    ax_matrix.axis('off')
-    ax_x.axis('off')
-    
-    axes_to_clear = [ax_ydesired, ax_yactual, ax_matrix, ax_x, ax_error]
-    return ax_ydesired, ax_yactual, ax_matrix, ax_x, ax_error
-
-
-ax_ydesired, ax_yactual, ax_matrix, ax_x, ax_error = make_axes(n, m)
+# Draw a new problem of size (n, m) and its gradient-descent trajectory of W,
+# evaluated in closed form at any iteration. Runs on the worker thread.
+def train(key, cancelled=None):
+    n_val, m_val = key
+    x = np.random.rand(n_val, m_val)
+    y_desired = np.random.rand(n_val, m_val)
+    W = np.random.rand(n_val, n_val)
+    trajectory = LinearMapTrajectory(W, x, y_desired, alpha)
+    return x, y_desired, trajectory, trajectory.errors(num_iterations)
+
+x, y_desired, trajectory, errors = train((n, m))
+
+# The axes and images are created once; later updates only replace image data
+# and extents, so the figure is never rebuilt
+gs = fig.add_gridspec(2, 5, height_ratios=[15, 1])
+ax_ydesired = fig.add_subplot(gs[0, 0])
+ax_yactual = fig.add_subplot(gs[0, 1])
+ax_matrix = fig.add_subplot(gs[0, 2])
+ax_x = fig.add_subplot(gs[0, 3])
+ax_error = fig.add_subplot(gs[0, 4])
+
+# Hide axes of the first four panels
+ax_ydesired.axis('off')
+ax_yactual.axis('off')
+ax_matrix.axis('off')
+ax_x.axis('off')
 
 ay_ydesired_display = ax_ydesired.imshow(y_desired, aspect='auto', cmap='Oranges', vmin=0, vmax=1)
-y_display = ax_yactual.imshow(y_actuals[0], aspect='auto', cmap='Reds', vmin=0, vmax=1)
-matrix_display = ax_matrix.imshow(Ws[0], aspect='auto', cmap='viridis', vmin=0, vmax=1)
+y_display = ax_yactual.imshow(trajectory.y_actual(0), aspect='auto', cmap='Reds', vmin=0, vmax=1)
+matrix_display = ax_matrix.imshow(trajectory.W(0), aspect='auto', cmap='viridis', vmin=0, vmax=1)
 x_display = ax_x.imshow(x, aspect='auto', cmap='gray', vmin=0, vmax=1)
 
 ax_ydesired.set_title("y_desired")
@@ -89,52 +78,39 @@ ax_error.set_ylim(0, 0.25)
 ax_error.set_xlabel("Iteration")
 ax_error.set_ylabel("Mean Squared Error")
 
-def recompute():
-    global x, y_desired, W, Ws, y_actuals, errors
-    global ax_ydesired, ax_yactual, ax_matrix, ax_x, ax_error
-    n_val = int(slider_n.val)
-    m_val = int(slider_m.val)
-    x = np.random.rand(n_val, m_val)
-    y_desired = np.random.rand(n_val, m_val)
-    W = np.random.rand(n_val, n_val)
-
-    Ws = [W.copy()]
-    y_actuals = [W @ x]
-    errors = [np.mean((y_desired - Ws[-1] @ x) ** 2)]
-    for _ in range(num_iterations):
-        y_actual = Ws[-1] @ x
-        gradient_W = -2 * (y_desired - y_actual) @ x.T
-        W_new = Ws[-1] - alpha * gradient_W
-        Ws.append(W_new)
-        y_actuals.append(W_new @ x)
-        errors.append(np.mean((y_desired - W_new @ x) ** 2))
-
-    ax_ydesired, ax_yactual, ax_matrix, ax_x, ax_error = make_axes(n_val, m_val)
-
-    ax_ydesired.imshow(y_desired, aspect='auto', cmap='Oranges', vmin=0, vmax=1)
-    ax_yactual.imshow(y_actuals[0], aspect='auto', cmap='Reds', vmin=0, vmax=1)
-    ax_matrix.imshow(Ws[0], aspect='auto', cmap='viridis', vmin=0, vmax=1)
-    ax_x.imshow(x, aspect='auto', cmap='gray', vmin=0, vmax=1)
-
-    ax_ydesired.set_title("y_desired")
-    ax_yactual.set_title("y_actual")
-    ax_matrix.set_title("W")
-    ax_x.set_title("x")
-    ax_error.set_title("Error over Iterations")
-
-    ax_error.plot(range(num_iterations + 1), errors, 'r-')
-    ax_error.axvline(0, color='black', linestyle='--')
-    ax_error.set_xlim(0, num_iterations)
-    ax_error.set_ylim(0, 0.25)
-    ax_error.set_xlabel("Iteration")
-    ax_error.set_ylabel("Mean Squared Error")
+# Replace an image's data, resizing its extent (and the view) to the new shape
+def set_image(image, data):
+    rows, cols = data.shape
+    image.set_data(data)
+    image.set_extent((-0.5, cols - 0.5, rows - 0.5, -0.5))
+    image.axes.set_xlim(-0.5, cols - 0.5)
+    image.axes.set_ylim(rows - 0.5, -0.5)
+
+# Show a newly trained problem (on the GUI thread, for the latest n and m only)
+def show_result(key, result):
+    global x, y_desired, trajectory, errors
+    x, y_desired, trajectory, errors = result
+    idx = int(slider_iter.val)
+    set_image(ay_ydesired_display, y_desired)
+    set_image(y_display, trajectory.y_actual(idx))
+    set_image(matrix_display, trajectory.W(idx))
+    set_image(x_display, x)
+    error_line.set_ydata(errors)
     fig.canvas.draw_idle()
 
+# Training runs off the GUI thread; slider moves are debounced, and only the
+# result for the latest (n, m) is drawn
+worker = BackgroundWorker(fig.canvas, train, show_result)
+worker.cache[(n, m)] = (x, y_desired, trajectory, errors)
+
+def recompute():
+    worker.submit((int(slider_n.val), int(slider_m.val)))
+
 def update(val):
     idx = int(slider_iter.val)
-    ax_yactual.images[0].set_data(y_actuals[idx])
-    ax_matrix.images[0].set_data(Ws[idx])
-    ax_error.lines[1].set_xdata([idx, idx])
+    y_display.set_data(trajectory.y_actual(idx))
+    matrix_display.set_data(trajectory.W(idx))
+    current_iter_line.set_xdata([idx, idx])
     fig.canvas.draw_idle()
 
 slider_iter.on_changed(update)
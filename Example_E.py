@@ -0,0 +1,45 @@
+"""
+Example_E.py
+Hyperparameter sweep of the matrix learning in Example_D: trains hundreds of
+(alpha, seed) pairs for several (n, m) sizes at once, and shows heatmaps of
+the final mean squared error and the error curves for a few learning rates.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from LinearMapTools import plot_mse_heatmap, sweep
+
+# Sweep parameters; seed 2025 with (n, m) = (10, 1) is the run of Example_D
+alphas = np.logspace(-3, -0.5, 200)
+seeds = np.arange(2025, 2025 + 200)
+sizes = [(10, 1), (10, 5), (50, 10)]
+num_iterations = 200
+
+start = time.perf_counter()
+errors = sweep(alphas, seeds, sizes, num_iterations)
+print(f"Trained {errors[..., 0].size} runs of {num_iterations} iterations in {time.perf_counter() - start:.2f} s")
+
+fig, axes = plt.subplots(2, len(sizes), figsize=(5 * len(sizes), 9))
+
+# Final error of every run; black marks runs that diverged
+for ax, (n, m), size_errors in zip(axes[0], sizes, errors):
+    image = plot_mse_heatmap(ax, size_errors[:, :, -1], alphas, seeds, title=f"Final MSE, n = {n}, m = {m}")
+    fig.colorbar(image, ax=ax, extend='both')
+
+# Median error curve over seeds for a few learning rates (diverged parts omitted)
+for ax, (n, m), size_errors in zip(axes[1], sizes, errors):
+    for index in np.linspace(0, len(alphas) - 1, 5).astype(int):
+        median = np.median(size_errors[index], axis=0)
+        ax.semilogy(np.where(median < 1e100, median, np.nan), label=f"alpha = {alphas[index]:.3g}")
+    ax.set_ylim(1e-12, 1e2)
+    ax.set_xlabel("Iteration")
+    ax.set_ylabel("Median MSE over seeds")
+    ax.legend()
+
+plt.tight_layout()
+plt.show()
@@ -0,0 +1,298 @@
+"""
+InteractiveTools.py
+Shared rendering helpers for the interactive examples: a blitting manager
+that redraws only the artists that change, a labeled scatter plot that
+recolors one set of points instead of rebuilding the plot on every update,
+a level-of-detail 3D scatter that stays responsive while it is rotated, a
+horizontal bar chart drawn as one artist, and a background worker that keeps
+slow computations off the GUI thread.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import functools
+import queue
+import sys
+import threading
+import time
+import traceback
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
+
+# Blitting manager (after the Matplotlib blitting tutorial). The static parts
+# of the figure are drawn once and cached; an update restores that cache and
+# draws only the animated artists. A slider is animated as a whole (its axes
+# and its value text, which lies outside them), so the cache never holds a
+# stale handle or value.
+class BlitManager:
+    def __init__(self, canvas, animated_artists=()):
+        self.canvas = canvas
+        self._background = None
+        self._artists = []
+        for artist in animated_artists:
+            self.add_artist(artist)
+        self.cid = canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self._artists.append(artist)
+
+    def remove_artist(self, artist):
+        self._artists.remove(artist)
+
+    # Keep a slider current under blitting; its own full redraw is disabled
+    def add_slider(self, slider):
+        slider.drawon = False
+        self.add_artist(slider.ax)
+        self.add_artist(slider.valtext)
+
+    # Cache the background on every full draw (resize, zoom, first show)
+    def on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self._artists:
+            figure.draw_artist(artist)
+
+    def update(self):
+        if self._background is None or not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+# 2D scatter plot colored by cluster label. One PathCollection is created once;
+# updates only change its face colors, the title and (when the number of
+# clusters changes) a legend capped at max_legend entries, and are blitted.
+class LabeledScatter:
+    def __init__(self, ax, X, max_legend=10):
+        self.ax = ax
+        self.max_legend = max_legend
+        self.colors = to_rgba_array(plt.rcParams['axes.prop_cycle'].by_key()['color'])
+        self.scatter = ax.scatter(X[:, 0], X[:, 1])
+        self.legend = None
+        self._n_labels = None
+        self.blit = BlitManager(ax.figure.canvas, [self.scatter, ax.title])
+
+    # Keep a slider current under blitting (see BlitManager.add_slider)
+    def attach_slider(self, slider):
+        self.blit.add_slider(slider)
+
+    # Build the legend only when the number of clusters changes
+    def _update_legend(self, n_labels):
+        if n_labels == self._n_labels:
+            return
+        self._n_labels = n_labels
+        handles = [Line2D([], [], marker='o', linestyle='', color=self.colors[i % len(self.colors)], label=f"Cluster {i}")
+                   for i in range(min(n_labels, self.max_legend))]
+        if n_labels > self.max_legend:
+            handles.append(Line2D([], [], linestyle='', label=f"... {n_labels - self.max_legend} more"))
+        if self.legend is not None:
+            self.blit.remove_artist(self.legend)
+        self.legend = self.ax.legend(handles=handles, loc='upper left')
+        self.blit.add_artist(self.legend)
+
+    # Move the points; the view limits change only when the data leaves the
+    # view or shrinks to under half of it. Returns True if the limits changed.
+    def _update_offsets(self, X):
+        self.scatter.set_offsets(X)
+        lo, hi = X.min(axis=0), X.max(axis=0)
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        view_lo, view_hi = np.array([x0, y0]), np.array([x1, y1])
+        if np.all(lo >= view_lo) and np.all(hi <= view_hi) and np.all(hi - lo >= 0.5 * (view_hi - view_lo)):
+            return False
+        margin = 0.05 * (hi - lo)
+        self.ax.set_xlim(lo[0] - margin[0], hi[0] + margin[0])
+        self.ax.set_ylim(lo[1] - margin[1], hi[1] + margin[1])
+        return True
+
+    def update(self, labels, title, X=None):
+        limits_changed = X is not None and self._update_offsets(X)
+        self.scatter.set_facecolors(self.colors[labels % len(self.colors)])
+        self.ax.set_title(title)
+        self._update_legend(labels.max() + 1)
+        if limits_changed:
+            self.ax.figure.canvas.draw_idle()
+        else:
+            self.blit.update()
+
+# Level-of-detail 3D scatter plot. Large point sets are drawn twice: the full
+# set, and a uniform random subsample of max_interactive points (which keeps
+# the relative density of every region). While a mouse button is held down
+# on the axes (rotating or zooming), only the subsample is shown; the full set
+# comes back when the button is released. Extra keyword arguments go to both
+# ax.scatter calls.
+class LODScatter3D:
+    def __init__(self, ax, points, max_interactive=5000, random_state=0, **kwargs):
+        self.ax = ax
+        self.full = ax.scatter(points[:, 0], points[:, 1], points[:, 2], **kwargs)
+        self.preview = None
+        if len(points) > max_interactive:
+            rng = np.random.default_rng(random_state)
+            subset = points[np.sort(rng.choice(len(points), max_interactive, replace=False))]
+            self.preview = ax.scatter(subset[:, 0], subset[:, 1], subset[:, 2], **kwargs)
+            self.preview.set_visible(False)
+            canvas = ax.figure.canvas
+            self.cids = [canvas.mpl_connect('button_press_event', self.on_press),
+                         canvas.mpl_connect('button_release_event', self.on_release)]
+
+    def _show_preview(self, preview):
+        self.full.set_visible(not preview)
+        self.preview.set_visible(preview)
+
+    def on_press(self, event):
+        if event.inaxes is self.ax:
+            self._show_preview(True)
+
+    def on_release(self, event):
+        if self.preview.get_visible():
+            self._show_preview(False)
+            self.ax.figure.canvas.draw_idle()
+
+# Horizontal bar chart drawn as a single PolyCollection instead of one
+# Rectangle per bar (as ax.barh does). The closed outlines of all bars live in
+# one (n, 5, 2) array, and the collection's paths are built once over views
+# into it, so set_widths is one in-place array assignment and the whole chart
+# is drawn in one call. Bar i is centered at y = i; extra keyword arguments
+# (color, alpha, label, ...) go to the PolyCollection.
+class HorizontalBars:
+    def __init__(self, ax, widths, height=0.8, left=0.0, **kwargs):
+        widths = np.asarray(widths, dtype=float)
+        self.left = left
+        self.verts = np.empty((len(widths), 5, 2))
+        self.verts[:, :, 1] = np.arange(len(widths))[:, None] + np.array([-0.5, -0.5, 0.5, 0.5, -0.5]) * height
+        self.verts[:, [0, 3, 4], 0] = left
+        self.verts[:, 1:3, 0] = left + widths[:, None]
+        kwargs.setdefault('linewidths', 0)
+        self.collection = PolyCollection(self.verts[:, :4], **kwargs)
+        # Point every (closed, 5-vertex) path at its rows of self.verts
+        for path, bar in zip(self.collection.get_paths(), self.verts):
+            path.vertices = bar
+        ax.add_collection(self.collection)
+        ax.autoscale_view()
+
+    def set_widths(self, widths):
+        self.verts[:, 1:3, 0] = self.left + np.asarray(widths)[:, None]
+        self.collection.stale = True
+        return self.collection
+
+# Runs compute(key, cancelled) on a worker thread so slider callbacks return
+# at once. Requests are debounced (the worker waits until no newer request has
+# arrived for delay seconds), any newer submit (even of a cached key) makes
+# cancelled() return True for the computation in progress, and only the
+# result for the latest request is handed to on_result(key, result), on the
+# GUI thread through a canvas timer. Results are cached by key; while idle the
+# worker also computes the keys returned by prefetch(key) around the last
+# request. compute may return None when it gives up after cancellation; if it
+# raises, the error is printed and the worker goes on with the next request.
+# A long computation can show intermediate results with report(key, partial):
+# the newest one for the latest request is handed to on_progress(key, partial)
+# on the GUI thread, until the final result arrives.
+class BackgroundWorker:
+    def __init__(self, canvas, compute, on_result, prefetch=None, delay=0.15, poll_interval=30, on_progress=None):
+        self.compute = compute
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.prefetch = prefetch
+        self.delay = delay
+        self.cache = {}
+        self._condition = threading.Condition()
+        self._request = None
+        self._request_time = 0.0
+        self._generation = 0
+        self._latest = None
+        self._prefetch_keys = []
+        self._results = queue.Queue()
+        self._progress = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.timer = canvas.new_timer(interval=poll_interval)
+        self.timer.add_callback(self._deliver)
+        self.timer.start()
+
+    def submit(self, key):
+        with self._condition:
+            self._latest = key
+            self._generation += 1
+            if key in self.cache:
+                self._request = None
+                self._schedule_prefetch(key)
+            else:
+                self._request = key
+                self._request_time = time.monotonic()
+                self._prefetch_keys = []
+            self._condition.notify()
+        if key in self.cache:
+            self.on_result(key, self.cache[key])
+
+    # Called from compute, on the worker thread
+    def report(self, key, partial):
+        self._progress.put((key, partial))
+
+    # Called with the lock held
+    def _schedule_prefetch(self, key):
+        if self.prefetch is not None:
+            self._prefetch_keys = [k for k in self.prefetch(key) if k not in self.cache]
+
+    # Submits are counted; a computation started at generation is stale once
+    # anything newer has been submitted
+    def _superseded(self, generation):
+        return self._generation != generation
+
+    def _next_key(self):
+        with self._condition:
+            while True:
+                if self._request is not None:
+                    remaining = self._request_time + self.delay - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(remaining)
+                        continue
+                    key, self._request = self._request, None
+                    return key, True, self._generation
+                if self._prefetch_keys:
+                    return self._prefetch_keys.pop(0), False, self._generation
+                self._condition.wait()
+
+    def _run(self):
+        while True:
+            key, requested, generation = self._next_key()
+            result = self.cache.get(key)
+            if result is None:
+                try:
+                    result = self.compute(key, functools.partial(self._superseded, generation))
+                except Exception:
+                    print(f"BackgroundWorker: computing {key!r} failed", file=sys.stderr)
+                    traceback.print_exc()
+                    continue
+                if result is None:
+                    continue
+                self.cache[key] = result
+            if requested:
+                self._results.put((key, result))
+                with self._condition:
+                    self._schedule_prefetch(key)
+
+    # Timer callback on the GUI thread: draw only the newest result, or else
+    # the newest intermediate result of the latest request. Both queues are
+    # filled by the worker thread in order, so draining the intermediate
+    # results first never shows one after its final result.
+    def _deliver(self):
+        progress = None
+        while not self._progress.empty():
+            progress = self._progress.get_nowait()
+        latest = None
+        while not self._results.empty():
+            latest = self._results.get_nowait()
+        if latest is not None and latest[0] == self._latest:
+            self.on_result(*latest)
+        elif progress is not None and progress[0] == self._latest and self.on_progress is not None:
+            self.on_progress(*progress)
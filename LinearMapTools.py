@@ -0,0 +1,203 @@
+"""
+LinearMapTools.py
+Shared engine for the adaptive linear mapping examples (Example2A, Example_D):
+the gradient-descent trajectory of W in y = W x, evaluated in closed form at
+any iteration instead of storing every iterate, a batched sweep that trains
+a whole grid of (alpha, seed, n, m) configurations at once, and a mini-batch
+trainer that learns W from a stream of (x, y) samples.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from DataTools import block_ranges, default_chunk_size, iter_chunks
+
+# Trajectory of gradient descent on the squared error ||y_desired - W x||^2,
+#   W_{k+1} = W_k + 2 alpha (y_desired - W_k x) x^T,
+# with x (n x m) fixed. The residual E_k = y_desired - W_k x then follows
+# E_{k+1} = E_k A with A = I - 2 alpha G and G = x^T x (m x m), so with the
+# eigendecomposition G = V diag(g) V^T:
+#   E_k = P diag(lambda^k) V^T,                  P = E_0 V, lambda = 1 - 2 alpha g
+#   W_k = W_0 + P diag((1 - lambda^k) / g) Q^T,  Q = x V
+# (the update is always in the column span of x). Only W_0 and the n x m
+# factors P and Q are stored, so memory does not grow with the number of
+# iterations, and any iterate costs one rank-m product.
+class LinearMapTrajectory:
+    def __init__(self, W0, x, y_desired, alpha):
+        self.W0 = np.asarray(W0, dtype=float)
+        self.x = np.asarray(x, dtype=float)
+        self.y_desired = np.asarray(y_desired, dtype=float)
+        self.alpha = alpha
+        g, V = np.linalg.eigh(self.x.T @ self.x)
+        # Directions with (numerically) zero curvature never move
+        self.g = np.where(g > np.finfo(float).eps * max(g.max(), 0.0) * len(g), g, 0.0)
+        self.V = V
+        self.rate = 1 - 2 * alpha * self.g
+        self.P = (self.y_desired - self.W0 @ self.x) @ V
+        self.Q = self.x @ V
+
+    # lambda^k for each eigenvalue (k may be an array of iterations)
+    def _decay(self, k):
+        return self.rate ** np.asarray(k, dtype=float)[..., None]
+
+    # (1 - lambda^k) / g, accurate for small g; 2 alpha k where g = 0
+    def _gain(self, k):
+        k = np.asarray(k, dtype=float)[..., None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stable = -np.expm1(k * np.log1p(-2 * self.alpha * self.g)) / self.g
+            direct = (1 - self.rate ** k) / self.g
+        gain = np.where(self.rate > 0, stable, direct)
+        return np.where(self.g > 0, gain, 2 * self.alpha * k)
+
+    # Weight matrix after k iterations
+    def W(self, k):
+        return self.W0 + (self.P * self._gain(k)) @ self.Q.T
+
+    # Residual y_desired - W_k x after k iterations
+    def residual(self, k):
+        return (self.P * self._decay(k)) @ self.V.T
+
+    # Output W_k x after k iterations
+    def y_actual(self, k):
+        return self.y_desired - self.residual(k)
+
+    # Mean squared error after each of the iterations 0..num_iterations, in
+    # O(num_iterations * m) without forming any iterate (V is orthogonal)
+    def errors(self, num_iterations):
+        column_energy = (self.P ** 2).sum(axis=0)
+        return (self._decay(np.arange(num_iterations + 1)) ** 2) @ column_energy / self.P.size
+
+# One configuration of the examples, drawn in the same order (x, y_desired,
+# then W) from np.random.RandomState(seed), so seed 2025 reproduces them.
+# w_init=None draws W at random (Example_D, Example2A); a number gives the
+# constant start of Example2.
+def make_problem(n, m, seed, w_init=None):
+    rng = np.random.RandomState(seed)
+    x = rng.rand(n, m)
+    y_desired = rng.rand(n, m)
+    W = rng.rand(n, n) if w_init is None else np.full((n, n), float(w_init))
+    return x, y_desired, W
+
+# Error curves of a whole grid of training runs at once. Runs with the same
+# (n, m) are stacked: x, y_desired and W become (seeds, n, m) and (seeds, n, n)
+# tensors, G = x^T x is diagonalized for all seeds with one batched eigh, and
+# the mean squared error of every (alpha, seed) pair is advanced one iteration
+# at a time with the residual recurrence of LinearMapTrajectory. Returns an
+# array of shape (len(sizes), len(alphas), len(seeds), num_iterations + 1);
+# diverging runs overflow to inf.
+def sweep(alphas, seeds, sizes, num_iterations, w_init=None):
+    alphas = np.asarray(alphas, dtype=float)
+    errors = np.empty((len(sizes), len(alphas), len(seeds), num_iterations + 1))
+    for i, (n, m) in enumerate(sizes):
+        x, y_desired, W = map(np.stack, zip(*(make_problem(n, m, seed, w_init) for seed in seeds)))
+        g, V = np.linalg.eigh(np.einsum('snm,snk->smk', x, x))
+        P = (y_desired - W @ x) @ V
+        energy = (P ** 2).sum(axis=1) / (n * m)
+        rate = (1 - 2 * alphas[:, None, None] * g) ** 2
+        decay = np.ones_like(rate)
+        with np.errstate(over='ignore', invalid='ignore'):
+            for k in range(num_iterations + 1):
+                errors[i, :, :, k] = np.einsum('asj,sj->as', decay, energy)
+                decay *= rate
+    return errors
+
+# Heatmap of final mean squared error (alphas x seeds, log color scale from
+# vmin to vmax) on ax; runs that diverged or ended above vmax are drawn
+# black. Returns the image, for a colorbar.
+def plot_mse_heatmap(ax, final_mse, alphas, seeds, title=None, vmin=1e-12, vmax=1e2):
+    mse = np.ma.masked_invalid(final_mse).T
+    cmap = plt.get_cmap('viridis').with_extremes(bad='black', over='black')
+    log_alphas = np.log10(alphas)
+    image = ax.imshow(mse, aspect='auto', origin='lower', cmap=cmap, norm=LogNorm(vmin, vmax, clip=False),
+                      extent=[log_alphas[0], log_alphas[-1], -0.5, len(seeds) - 0.5])
+    ax.set_xlabel("log10(alpha)")
+    ax.set_ylabel("Seed index")
+    if title is not None:
+        ax.set_title(title)
+    return image
+
+# Mini-batch gradient descent for a linear map y = W x learned from a stream
+# of (x, y) samples, with the update of the examples averaged over each batch:
+#   gradient_W = -2 * (y_desired - y_actual) @ x.T / batch_size
+# Samples are rows (x chunks are (b, n_in), y chunks (b, n_out)), as they are
+# stored in .npy files, of any float dtype: rows that are not float64 (e.g.
+# a float32 memmap) are converted batch by batch into buffers. The residual,
+# gradient and conversion buffers are allocated once and the update is done
+# in place, so training allocates nothing per batch. Every sample_every batches
+# the batch MSE is recorded in .history as (samples seen, error) and passed
+# to callback(trainer, n_seen, error), e.g. to redraw an error plot.
+class MiniBatchTrainer:
+    def __init__(self, W, alpha, batch_size=256, sample_every=100, callback=None):
+        self.W = np.array(W, dtype=float)
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.sample_every = sample_every
+        self.callback = callback
+        self.n_seen = 0
+        self.n_batches = 0
+        self.history = []
+        n_out, n_in = self.W.shape
+        self._residual = np.empty((batch_size, n_out))
+        self._gradient = np.empty((n_out, n_in))
+        self._x = np.empty((batch_size, n_in))
+        self._y = np.empty((batch_size, n_out))
+
+    # Rows as float64, converted into buffer[:len(rows)] only when needed
+    @staticmethod
+    def _as_float(rows, buffer):
+        if rows.dtype == buffer.dtype:
+            return rows
+        converted = buffer[:len(rows)]
+        converted[...] = rows
+        return converted
+
+    # One gradient step on a batch of at most batch_size rows
+    def _step(self, x, y):
+        b = len(x)
+        x = self._as_float(x, self._x)
+        y = self._as_float(y, self._y)
+        residual = self._residual[:b]
+        np.matmul(x, self.W.T, out=residual)
+        np.subtract(y, residual, out=residual)
+        np.matmul(residual.T, x, out=self._gradient)
+        self._gradient *= 2 * self.alpha / b
+        self.W += self._gradient
+        self.n_seen += b
+        self.n_batches += 1
+        if self.n_batches % self.sample_every == 0:
+            error = np.vdot(residual, residual) / residual.size
+            self.history.append((self.n_seen, error))
+            if self.callback is not None:
+                self.callback(self, self.n_seen, error)
+
+    # Train on one chunk of rows, batch_size rows at a time
+    def partial_fit(self, x, y):
+        x = np.asarray(x)
+        y = np.asarray(y)
+        for start, stop in block_ranges(len(x), self.batch_size):
+            self._step(x[start:stop], y[start:stop])
+        return self
+
+    # source_x, source_y: arrays or memmaps of rows, read chunk_size rows at a
+    # time; or source_x alone as a generator of (x, y) chunks
+    def fit(self, source_x, source_y=None, chunk_size=None):
+        if source_y is None:
+            chunks = source_x
+        else:
+            if chunk_size is None:
+                chunk_size = default_chunk_size(source_x)
+            # Whole batches per chunk, so every batch has batch_size rows
+            chunk_size = max(self.batch_size, chunk_size - chunk_size % self.batch_size)
+            chunks = zip(iter_chunks(source_x, chunk_size), iter_chunks(source_y, chunk_size))
+        for x, y in chunks:
+            self.partial_fit(x, y)
+        return self
+
+    # Recorded (samples seen, batch MSE) pairs as two arrays
+    def error_history(self):
+        history = np.array(self.history, dtype=float).reshape(-1, 2)
+        return history[:, 0], history[:, 1]
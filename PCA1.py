@@ -10,7 +10,8 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 """
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
+from PCATools import StreamingPCA
+from InteractiveTools import LODScatter3D
 
 # Generate a 3D point cloud centered along a plane with some noise
 np.random.seed(42)
@@ -20,16 +21,17 @@ Y = 0.5 * X + 0.1 * np.random.randn(n_points)
 Z = 0.2 * X + 0.1 * np.random.randn(n_points)
 data = np.vstack((X, Y, Z)).T
 
-# Apply PCA
-pca = PCA(n_components=3)
+# Apply PCA (streaming engine; fit also accepts memmaps and generators of chunks)
+pca = StreamingPCA(n_components=3)
 pca.fit(data)
 components = pca.components_
 mean = pca.mean_
 
-# Plot the original point cloud and principal components
+# Plot the original point cloud and principal components. For large n_points
+# only a subsample of max_interactive points is drawn while rotating.
 fig = plt.figure()
 ax = fig.add_subplot(111, projection='3d')
-ax.scatter(data[:, 0], data[:, 1], data[:, 2], alpha=0.6)
+scatter = LODScatter3D(ax, data, max_interactive=5000, alpha=0.6)
 
 # Plot the principal components
 for length, vector in zip(pca.explained_variance_, components):
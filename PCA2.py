@@ -10,22 +10,50 @@ License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0
 """
 import open3d as o3d
 import numpy as np
-from sklearn.decomposition import PCA
+from PCATools import ArrayCache, cache_key, decimated_pca, file_digest
 
-# Load 3D bunny model as a point cloud 
-mesh = o3d.io.read_triangle_mesh(o3d.data.BunnyMesh().path)
-mesh.compute_vertex_normals()
-points = np.asarray(mesh.vertices)
+# Bunny mesh file; set mesh_path to a local mesh file to run offline
+mesh_path = None
+if mesh_path is None:
+    mesh_path = o3d.data.BunnyMesh().path
 
-# Apply PCA
-pca = PCA(n_components=3)
-pca.fit(points)
-components = pca.components_
-mean = pca.mean_
+# Decimated PCA: points used for the fit, and the largest estimated axis
+# error (degrees) before refitting on all points
+target_points = 5000
+tolerance_deg = 2.0
+
+# Load the mesh, compute its normals and apply PCA (only on a cache miss)
+def load_and_fit():
+    mesh = o3d.io.read_triangle_mesh(mesh_path)
+    mesh.compute_vertex_normals()
+    points = np.asarray(mesh.vertices)
+
+    # Fit on a decimated subset; falls back to all points when the estimated
+    # axis error exceeds the tolerance
+    pca, report = decimated_pca(points, n_components=3, target_points=target_points, tolerance_deg=tolerance_deg)
+    print(f"PCA fitted on {report['n_used']} of {report['n_points']} points; "
+          f"axis error (degrees): {np.round(report['axis_error_deg'], 2)}"
+          + (" -> refitted on all points" if report['fallback'] else ""))
+    return {
+        'vertices': points,
+        'normals': np.asarray(mesh.vertex_normals),
+        'components': pca.components_,
+        'mean': pca.mean_,
+        'explained_variance': pca.explained_variance_,
+    }
+
+# Results are cached on disk by the content hash of the mesh file and the fit
+# settings, so a second launch skips loading and PCA and memory-maps the
+# stored arrays instead
+cached = ArrayCache().get_or_compute(cache_key(file_digest(mesh_path), 'PCA2', target_points, tolerance_deg, 2),
+                                     load_and_fit)
+points = cached['vertices']
+components = cached['components']
+mean = cached['mean']
 
 # Center and transform points
 centered_points = points - mean
-transformed_points = pca.transform(points)
+transformed_points = centered_points @ components.T
 
 # Create Open3D point clouds
 original_pcd = o3d.geometry.PointCloud()
@@ -1,6 +1,6 @@
 """
 PCA3.py
-PCA demonstration using a synthetic spherical mesh with axis alignment 
+PCA demonstration using points sampled on a synthetic sphere with axis alignment 
 visualization.
 
 By Juan B. Gutiérrez, Professor of Mathematics 
@@ -9,25 +9,37 @@ University of Texas at San Antonio.
 License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
 """
 import open3d as o3d
-import numpy as np
-from sklearn.decomposition import PCA
-
-# Load a simple 3D teapot mesh
-mesh = o3d.geometry.TriangleMesh.create_sphere(radius=1.0).subdivide_midpoint(1)
-mesh.compute_vertex_normals()
-
-# Sample sparse points from the mesh surface
-pcd = mesh.sample_points_poisson_disk(number_of_points=300)
-points = np.asarray(pcd.points)
-
-# Apply PCA
-pca = PCA(n_components=3)
-pca.fit(points)
-components = pca.components_
-mean = pca.mean_
+from PCATools import ArrayCache, StreamingPCA, cache_key, fibonacci_sphere
+
+# Synthetic object parameters
+radius = 1.0
+number_of_points = 300
+seed = 0
+
+# Sample the sphere and apply PCA (only on a cache miss)
+def sample_and_fit():
+    # Evenly spread points on the sphere surface (Fibonacci lattice, O(n))
+    points = fibonacci_sphere(number_of_points, radius=radius, seed=seed)
+
+    # Apply PCA
+    pca = StreamingPCA(n_components=3)
+    pca.fit(points)
+    return {
+        'points': points,
+        'components': pca.components_,
+        'mean': pca.mean_,
+        'explained_variance': pca.explained_variance_,
+    }
+
+# Results are cached on disk by the object parameters, so a second launch
+# memory-maps the stored sample and PCA basis instead of recomputing them
+cached = ArrayCache().get_or_compute(cache_key('PCA3', radius, number_of_points, seed, 2), sample_and_fit)
+points = cached['points']
+components = cached['components']
+mean = cached['mean']
 
 # Transform to PCA coordinates
-transformed_points = pca.transform(points)
+transformed_points = (points - mean) @ components.T
 
 # Create Open3D point clouds
 original_pcd = o3d.geometry.PointCloud()
@@ -0,0 +1,161 @@
+"""
+PCABatch.py
+Headless batch version of PCA2/PCA3: aligns every mesh and point cloud in a
+directory to its principal axes, in parallel across a process pool. Writes
+the aligned clouds and a summary table (CSV) of means, axes and explained
+variances. Never opens a window, so it runs on servers without a display.
+
+Usage:
+    python PCABatch.py scans/ aligned/ --workers 8
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PCATools import decimated_pca
+
+# File types read through Open3D (meshes and point clouds) and NumPy
+MESH_EXTENSIONS = {'.obj', '.stl', '.off', '.gltf', '.glb'}
+CLOUD_EXTENSIONS = {'.pcd', '.xyz', '.xyzn', '.xyzrgb', '.pts'}
+SUPPORTED_EXTENSIONS = MESH_EXTENSIONS | CLOUD_EXTENSIONS | {'.ply', '.npy'}
+
+# Columns of the summary table
+AXIS_COLUMNS = [f"axis{i}_{c}" for i in range(1, 4) for c in 'xyz']
+SUMMARY_COLUMNS = (['file', 'status', 'n_points', 'n_used', 'fallback', 'seconds', 'mean_x', 'mean_y', 'mean_z']
+                   + AXIS_COLUMNS
+                   + [f"variance{i}" for i in range(1, 4)]
+                   + [f"variance_ratio{i}" for i in range(1, 4)]
+                   + ['output', 'error'])
+
+# Input files in a directory (optionally its subdirectories), sorted by path
+def find_inputs(input_dir, recursive=False):
+    if recursive:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(input_dir) for name in names]
+    else:
+        paths = [os.path.join(input_dir, name) for name in os.listdir(input_dir)]
+    return sorted(p for p in paths if os.path.isfile(p) and os.path.splitext(p)[1].lower() in SUPPORTED_EXTENSIONS)
+
+# Points (n x 3) and normals (n x 3, or None) of a file. A .ply file may hold
+# a mesh or a point cloud; mesh vertices are used as the cloud, as in PCA2.
+def load_points(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        return np.load(path, mmap_mode='r'), None
+    import open3d as o3d
+    if ext in MESH_EXTENSIONS or ext == '.ply':
+        mesh = o3d.io.read_triangle_mesh(path)
+        if len(mesh.triangles) > 0:
+            mesh.compute_vertex_normals()
+            return np.asarray(mesh.vertices), np.asarray(mesh.vertex_normals)
+    pcd = o3d.io.read_point_cloud(path)
+    normals = np.asarray(pcd.normals) if pcd.has_normals() else None
+    return np.asarray(pcd.points), normals
+
+# Write an aligned cloud as .npy (no Open3D needed) or through Open3D (.ply, .pcd)
+def save_points(path, points, normals=None):
+    if path.endswith('.npy'):
+        np.save(path, points)
+        return
+    import open3d as o3d
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    if normals is not None:
+        pcd.normals = o3d.utility.Vector3dVector(normals)
+    if not o3d.io.write_point_cloud(path, pcd):
+        raise IOError(f"could not write {path}")
+
+# Keep BLAS single-threaded in each worker; the pool supplies the parallelism
+def _init_worker():
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+# Fit and apply the PCA transform to one file. Runs in a worker process and
+# returns one summary row; errors are recorded in the row instead of raised,
+# so one bad scan does not stop the batch.
+def align_file(path, input_dir, output_dir, output_format='ply', target_points=5000, tolerance_deg=2.0):
+    relative = os.path.relpath(path, input_dir)
+    row = {'file': relative, 'status': 'ok'}
+    start = time.perf_counter()
+    try:
+        points, normals = load_points(path)
+        if points.ndim != 2 or points.shape[1] != 3 or len(points) < 3:
+            raise ValueError(f"expected an (n, 3) point set with n >= 3, got shape {points.shape}")
+        pca, report = decimated_pca(points, n_components=3, target_points=target_points, tolerance_deg=tolerance_deg)
+        components = pca.components_
+        # Right-handed frame, so aligned scans are rotated but never mirrored
+        if np.linalg.det(components) < 0:
+            components = components * np.array([[1.0], [1.0], [-1.0]])
+
+        aligned = (np.asarray(points) - pca.mean_) @ components.T
+        aligned_normals = None if normals is None else normals @ components.T
+        # The source extension stays in the name, so scan.ply and scan.obj
+        # become scan_ply_aligned.ply and scan_obj_aligned.ply
+        root, ext = os.path.splitext(relative)
+        output = os.path.join(output_dir, f"{root}_{ext[1:].lower()}_aligned.{output_format}")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        save_points(output, aligned, aligned_normals)
+
+        row.update({'n_points': report['n_points'], 'n_used': report['n_used'], 'fallback': report['fallback'],
+                    'output': os.path.relpath(output, output_dir)})
+        row.update(zip(['mean_x', 'mean_y', 'mean_z'], pca.mean_))
+        row.update(zip(AXIS_COLUMNS, components.ravel()))
+        row.update(zip([f"variance{i}" for i in range(1, 4)], pca.explained_variance_))
+        row.update(zip([f"variance_ratio{i}" for i in range(1, 4)], pca.explained_variance_ratio_))
+    except Exception as error:
+        row.update({'status': 'error', 'error': f"{type(error).__name__}: {error}"})
+    row['seconds'] = round(time.perf_counter() - start, 3)
+    return row
+
+# Align every file in input_dir across a process pool and write the summary
+# table, in input order, to output_dir/summary.csv. Returns the rows.
+def run_batch(input_dir, output_dir, workers=None, recursive=False, output_format='ply',
+              target_points=5000, tolerance_deg=2.0, summary_name='summary.csv'):
+    paths = find_inputs(input_dir, recursive)
+    os.makedirs(output_dir, exist_ok=True)
+    rows = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(align_file, path, input_dir, output_dir, output_format, target_points, tolerance_deg): path
+                   for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows[futures[future]] = row
+            print(f"[{done}/{len(paths)}] {row['file']}: {row['status']}"
+                  + (f" ({row['error']})" if row['status'] == 'error' else ""))
+
+    rows = [rows[path] for path in paths]
+    with open(os.path.join(output_dir, summary_name), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Align meshes and point clouds to their principal axes.")
+    parser.add_argument('input_dir', help="directory of mesh and point-cloud files (.ply, .obj, .stl, .off, .pcd, .xyz, .npy, ...)")
+    parser.add_argument('output_dir', help="directory for the aligned clouds and summary.csv")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--recursive', action='store_true', help="also process subdirectories")
+    parser.add_argument('--format', dest='output_format', choices=['ply', 'pcd', 'npy'], default='ply',
+                        help="file format of the aligned clouds")
+    parser.add_argument('--target-points', type=int, default=5000, help="points used to fit each PCA")
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help="largest axis error (degrees) before refitting on all points")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = run_batch(args.input_dir, args.output_dir, args.workers, args.recursive, args.output_format,
+                     args.target_points, args.tolerance)
+    failed = sum(row['status'] == 'error' for row in rows)
+    print(f"Aligned {len(rows) - failed} of {len(rows)} files in {time.perf_counter() - start:.1f} s; "
+          f"summary written to {os.path.join(args.output_dir, 'summary.csv')}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
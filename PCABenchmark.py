@@ -0,0 +1,56 @@
+"""
+PCABenchmark.py
+Benchmark of the PCA backends in PCATools on high-dimensional data: runtime,
+peak memory and subspace error of the top-k axes against the exact
+eigendecomposition, across a range of n (points) and d (dimensions).
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import time
+import tracemalloc
+import numpy as np
+from scipy.linalg import subspace_angles
+from PCATools import StreamingPCA, TruncatedPCA
+
+# Benchmark parameters
+sizes = [(5_000, 200), (5_000, 1_000), (20_000, 1_000), (20_000, 2_000), (10_000, 4_000)]
+n_components = 10
+
+backends = {
+    'exact (eigh)': lambda: StreamingPCA(n_components),
+    'streaming lanczos': lambda: StreamingPCA(n_components, solver='lanczos'),
+    'randomized svd': lambda: TruncatedPCA(n_components, solver='randomized'),
+    'lanczos svd': lambda: TruncatedPCA(n_components, solver='lanczos'),
+}
+
+# Synthetic embeddings: a decaying spectrum in a random orientation, plus an offset
+def make_data(n, d, rng):
+    scales = 1.0 / np.arange(1, d + 1)
+    rotation, _ = np.linalg.qr(rng.standard_normal((d, d)))
+    return (rng.standard_normal((n, d)) * scales) @ rotation + 5.0
+
+# Wall time (s), peak traced memory (MB) and the fitted model
+def measure(make_model, X):
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = make_model().fit(X)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, model
+
+rng = np.random.default_rng(42)
+print(f"{'n':>7} {'d':>6} {'backend':>18} {'time [s]':>9} {'peak [MB]':>10} {'sin(angle)':>11}")
+for n, d in sizes:
+    X = make_data(n, d, rng)
+    reference = None
+    for name, make_model in backends.items():
+        elapsed, peak, model = measure(make_model, X)
+        if reference is None:
+            reference = model.components_
+        # Sine of the largest principal angle between the top-k subspaces
+        error = np.sin(subspace_angles(reference.T, model.components_.T).max())
+        print(f"{n:>7} {d:>6} {name:>18} {elapsed:>9.3f} {peak:>10.1f} {error:>11.2e}")
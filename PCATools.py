@@ -0,0 +1,341 @@
+"""
+PCATools.py
+Shared PCA engine for the PCA examples: a streaming PCA that accumulates the
+mean and scatter matrix chunk by chunk, so it runs on point clouds of any
+size read from generators or memory-mapped files, and a truncated PCA
+(randomized SVD or Lanczos) that computes only the top components of
+high-dimensional data, and PCA on a decimated subset (random or voxel grid)
+with axis error estimates for huge point clouds. Also a fast, seeded sphere
+sampler (Fibonacci lattice) and an on-disk cache of arrays (meshes, samples,
+PCA bases) keyed by content hash, stored as memory-mappable .npy files.
+
+By Juan B. Gutiérrez, Professor of Mathematics
+University of Texas at San Antonio.
+
+License: Creative Commons Attribution-ShareAlike 4.0 International (CC BY-SA 4.0)
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+from scipy.sparse.linalg import LinearOperator, eigsh, svds
+from scipy.spatial.transform import Rotation
+from DataTools import block_ranges, default_chunk_size, iter_chunks
+
+# scikit-learn's sign convention: the largest entry of each axis is positive
+def _flip_signs(components):
+    signs = np.sign(components[np.arange(len(components)), np.argmax(np.abs(components), axis=1)])
+    return components * signs[:, None]
+
+# Streaming PCA. As in PCA.m, the principal axes are the eigenvectors of the
+# scatter matrix S = N'*N of the mean-centered data. Here S and the mean are
+# accumulated chunk by chunk with the pairwise (Chan et al.) update of
+# Welford's algorithm, which stays accurate when the mean is large compared
+# with the spread. Exposes the same components_, mean_, explained_variance_
+# and explained_variance_ratio_ as sklearn.decomposition.PCA.
+# solver='full' diagonalizes the whole d x d covariance; solver='lanczos'
+# computes only the top n_components eigenpairs (scipy eigsh), which is much
+# cheaper when d is in the thousands.
+class StreamingPCA:
+    def __init__(self, n_components=None, solver='full'):
+        if solver not in ('full', 'lanczos'):
+            raise ValueError(f"unknown solver {solver!r}; expected 'full' or 'lanczos'")
+        if solver == 'lanczos' and n_components is None:
+            raise ValueError("solver='lanczos' needs n_components")
+        self.n_components = n_components
+        self.solver = solver
+        self.n_samples_seen_ = 0
+        self._mean = None
+        self._scatter = None
+        self._fitted = None
+
+    # sample_weight counts each row that many times (e.g. voxel populations)
+    def partial_fit(self, chunk, sample_weight=None):
+        chunk = np.asarray(chunk, dtype=float)
+        weights = np.ones(len(chunk)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+        m = weights.sum()
+        if m == 0:
+            return self
+        chunk_mean = weights @ chunk / m
+        centered = chunk - chunk_mean
+        chunk_scatter = (centered * weights[:, None]).T @ centered
+        if self.n_samples_seen_ == 0:
+            self._mean = chunk_mean
+            self._scatter = chunk_scatter
+        else:
+            n = self.n_samples_seen_
+            delta = chunk_mean - self._mean
+            self._scatter += chunk_scatter + np.outer(delta, delta) * (n * m / (n + m))
+            self._mean += delta * (m / (n + m))
+        self.n_samples_seen_ += m
+        self._fitted = None
+        return self
+
+    # source: array, memmap or generator of (n, d) chunks
+    def fit(self, source, chunk_size=None):
+        self.__init__(self.n_components, self.solver)
+        if chunk_size is None:
+            chunk_size = default_chunk_size(source)
+        for chunk in iter_chunks(source, chunk_size):
+            self.partial_fit(chunk)
+        return self
+
+    # Eigendecomposition of the covariance, largest eigenvalues first
+    def _decompose(self):
+        if self._fitted is None:
+            covariance = self._scatter / max(self.n_samples_seen_ - 1, 1)
+            if self.solver == 'lanczos' and self.n_components < len(covariance) - 1:
+                eigenvalues, eigenvectors = eigsh(covariance, k=self.n_components, which='LA')
+            else:
+                eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+            order = np.argsort(eigenvalues)[::-1]
+            eigenvalues = np.maximum(eigenvalues[order], 0)
+            components = _flip_signs(eigenvectors[:, order].T)
+            k = len(eigenvalues) if self.n_components is None else self.n_components
+            total_variance = np.trace(covariance)
+            self._fitted = (components[:k], eigenvalues[:k], eigenvalues[:k] / total_variance)
+        return self._fitted
+
+    @property
+    def mean_(self):
+        return self._mean
+
+    @property
+    def components_(self):
+        return self._decompose()[0]
+
+    @property
+    def explained_variance_(self):
+        return self._decompose()[1]
+
+    @property
+    def explained_variance_ratio_(self):
+        return self._decompose()[2]
+
+    # Coordinates of the points in the principal axes
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self._mean) @ self.components_.T
+
+# Truncated PCA of a data matrix X (array or memmap, n x d) that computes only
+# the top n_components axes, without forming the d x d covariance. The
+# centering is implicit: products with X - mean are evaluated as X @ M minus
+# a rank-one correction, chunk_size rows at a time, so X is never copied.
+# solver='randomized' is the randomized SVD of Halko, Martinsson and Tropp
+# (n_oversamples extra directions, n_iter power iterations); solver='lanczos'
+# runs ARPACK's svds on the same implicit operator.
+class TruncatedPCA:
+    def __init__(self, n_components, solver='randomized', n_oversamples=10, n_iter=4, random_state=0, chunk_size=None):
+        if solver not in ('randomized', 'lanczos'):
+            raise ValueError(f"unknown solver {solver!r}; expected 'randomized' or 'lanczos'")
+        self.n_components = n_components
+        self.solver = solver
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.chunk_size = chunk_size
+
+    # (X - mean) @ M
+    def _matmat(self, X, M):
+        out = np.empty((len(X), M.shape[1]))
+        shift = self.mean_ @ M
+        for start, stop in block_ranges(len(X), self._chunk_size):
+            out[start:stop] = np.asarray(X[start:stop], dtype=float) @ M - shift
+        return out
+
+    # (X - mean).T @ Y
+    def _rmatmat(self, X, Y):
+        out = -np.outer(self.mean_, Y.sum(axis=0))
+        for start, stop in block_ranges(len(X), self._chunk_size):
+            out += np.asarray(X[start:stop], dtype=float).T @ Y[start:stop]
+        return out
+
+    def _randomized(self, X):
+        rng = np.random.default_rng(self.random_state)
+        n_random = min(self.n_components + self.n_oversamples, min(X.shape))
+        Q, _ = np.linalg.qr(self._matmat(X, rng.standard_normal((X.shape[1], n_random))))
+        for _ in range(self.n_iter):
+            Z, _ = np.linalg.qr(self._rmatmat(X, Q))
+            Q, _ = np.linalg.qr(self._matmat(X, Z))
+        _, s, vt = np.linalg.svd(self._rmatmat(X, Q).T, full_matrices=False)
+        return s, vt
+
+    def _lanczos(self, X):
+        operator = LinearOperator(
+            X.shape, dtype=float,
+            matvec=lambda v: self._matmat(X, np.reshape(v, (-1, 1))).ravel(),
+            rmatvec=lambda v: self._rmatmat(X, np.reshape(v, (-1, 1))).ravel(),
+            matmat=lambda M: self._matmat(X, M),
+            rmatmat=lambda M: self._rmatmat(X, M))
+        _, s, vt = svds(operator, k=self.n_components, random_state=self.random_state)
+        order = np.argsort(s)[::-1]
+        return s[order], vt[order]
+
+    def fit(self, X):
+        n = len(X)
+        self._chunk_size = self.chunk_size if self.chunk_size is not None else default_chunk_size(X)
+        # One pass for the mean and one for the total variance
+        total, squares = 0.0, 0.0
+        for start, stop in block_ranges(n, self._chunk_size):
+            total = total + np.asarray(X[start:stop], dtype=float).sum(axis=0)
+        self.mean_ = total / n
+        for start, stop in block_ranges(n, self._chunk_size):
+            squares += ((np.asarray(X[start:stop], dtype=float) - self.mean_) ** 2).sum()
+
+        s, vt = self._randomized(X) if self.solver == 'randomized' else self._lanczos(X)
+        k = self.n_components
+        self.components_ = _flip_signs(vt[:k])
+        self.explained_variance_ = s[:k] ** 2 / (n - 1)
+        self.explained_variance_ratio_ = self.explained_variance_ / (squares / (n - 1))
+        return self
+
+    # Coordinates of the points in the principal axes
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) @ self.components_.T
+
+# Voxel-grid decimation: the points in each occupied voxel of side voxel_size
+# are replaced by their centroid. Returns the centroids and the number of
+# points in each voxel.
+def voxel_downsample(points, voxel_size):
+    points = np.asarray(points, dtype=float)
+    cells = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    keys = np.ravel_multi_index(cells.T, cells.max(axis=0) + 1)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    centroids = np.column_stack([np.bincount(inverse, weights=column) for column in points.T])
+    return centroids / counts[:, None], counts
+
+# Voxel size that leaves roughly target_points occupied voxels. Scanned
+# surfaces fill voxels like a 2D set, so the count scales as 1 / size**2.
+def _voxel_size_for(points, target_points, n_steps=6):
+    extent = np.ptp(points, axis=0)
+    voxel_size = np.prod(extent[extent > 0]) ** (1 / max((extent > 0).sum(), 1)) / target_points ** 0.5
+    for _ in range(n_steps):
+        _, counts = voxel_downsample(points, voxel_size)
+        ratio = len(counts) / target_points
+        if 0.8 < ratio < 1.25:
+            break
+        voxel_size *= ratio ** 0.5
+    return voxel_size
+
+# Davis-Kahan bound (in degrees) on the angle between each principal axis and
+# its counterpart after a perturbation of spectral norm at most error_norm:
+# sin(angle) <= 2 * error_norm / eigengap
+def _axis_error_bound(eigenvalues, error_norm):
+    gaps = np.abs(eigenvalues[:, None] - eigenvalues[None, :])
+    np.fill_diagonal(gaps, np.inf)
+    return np.degrees(np.arcsin(np.minimum(1.0, 2 * error_norm / gaps.min(axis=1))))
+
+# PCA of a large point cloud fitted on a decimated subset of about
+# target_points points, with an estimate of how far each axis deviates from
+# the full fit; when any estimate exceeds tolerance_deg (e.g. for nearly equal
+# eigenvalues) the PCA is refitted on all points. Returns the fitted
+# StreamingPCA and a report of points used, axis errors and fallback.
+#   method='random': a uniform random subset; only those rows are read, so the
+#     cost does not grow with the cloud. The axis error is estimated from the
+#     angle between the axes fitted on the two halves of the subset.
+#   method='voxel': voxel-grid centroids weighted by voxel population. The mean
+#     is exact and the covariance misses only the spread inside voxels, which
+#     is at most d * voxel_size**2 / 4, so the bound is rigorous; but every
+#     point is read and sorted into voxels.
+def decimated_pca(points, n_components=3, target_points=5000, tolerance_deg=2.0, method='random', random_state=0):
+    n = len(points)
+    report = {'n_points': n, 'n_used': n, 'method': method,
+              'axis_error_deg': np.zeros(n_components), 'fallback': False}
+    if n > target_points:
+        if method == 'random':
+            rng = np.random.default_rng(random_state)
+            sample = np.asarray(points[np.sort(rng.choice(n, target_points, replace=False))], dtype=float)
+            pca = StreamingPCA().partial_fit(sample)
+            # Axes fitted on two disjoint halves differ by about twice the
+            # error of the whole subset, so their angle is a conservative estimate
+            halves = rng.permutation(target_points)[:2 * (target_points // 2)].reshape(2, -1)
+            first = StreamingPCA().partial_fit(sample[halves[0]]).components_
+            second = StreamingPCA().partial_fit(sample[halves[1]]).components_
+            axis_error = np.degrees(np.arccos(np.minimum(1.0, np.abs((first * second).sum(axis=1)))))
+            n_used = target_points
+        elif method == 'voxel':
+            points = np.asarray(points, dtype=float)
+            voxel_size = _voxel_size_for(points, target_points)
+            centroids, counts = voxel_downsample(points, voxel_size)
+            pca = StreamingPCA().partial_fit(centroids, sample_weight=counts)
+            axis_error = _axis_error_bound(pca.explained_variance_, points.shape[1] * voxel_size ** 2 / 4)
+            n_used = len(centroids)
+        else:
+            raise ValueError(f"unknown method {method!r}; expected 'random' or 'voxel'")
+        report['axis_error_deg'] = axis_error[:n_components]
+        report['n_used'] = n_used
+        if report['axis_error_deg'].max() <= tolerance_deg:
+            pca.n_components = n_components
+            pca._fitted = None
+            return pca, report
+        report['fallback'] = True
+        report['n_used'] = n
+    return StreamingPCA(n_components).fit(points), report
+
+# Points spread evenly over a sphere (Fibonacci lattice): point i sits at
+# height z = 1 - (2i + 1) / n and turns by the golden angle from the last, so
+# every point covers the same area. O(n) and vectorized. With a seed the
+# lattice is given a random rotation, so different seeds give different but
+# reproducible samples; without one the lattice is returned as is.
+def fibonacci_sphere(n, radius=1.0, seed=None, dtype=np.float64):
+    i = np.arange(n, dtype=dtype)
+    z = 1 - (2 * i + 1) / n
+    r = np.sqrt(1 - z * z)
+    phi = i * (np.pi * (3 - np.sqrt(5)))
+    points = np.empty((n, 3), dtype=dtype)
+    points[:, 0] = r * np.cos(phi)
+    points[:, 1] = r * np.sin(phi)
+    points[:, 2] = z
+    if seed is not None:
+        points = points @ Rotation.random(random_state=seed).as_matrix().T.astype(dtype)
+    points *= radius
+    return points
+
+# Default location of the on-disk cache, next to the examples
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.aidex_cache')
+
+# SHA-1 of a file's contents, read in 1 MB blocks
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Cache key from any number of parts (file digests, parameters, versions)
+def cache_key(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+# On-disk cache of named arrays. Each key is a directory of uncompressed .npy
+# files, loaded back as read-only memmaps so a hit costs almost nothing.
+# Entries are written to a temporary directory and renamed into place, so an
+# interrupted run never leaves a partial entry behind.
+class ArrayCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def load(self, key):
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(path):
+            return None
+        return {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+                for name in os.listdir(path) if name.endswith('.npy')}
+
+    def save(self, key, arrays):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.cache_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + '.npy'), np.asarray(array))
+        try:
+            os.rename(staging, os.path.join(self.cache_dir, key))
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(staging)
+
+    # Cached arrays for key, computing and storing them with compute() on a miss
+    def get_or_compute(self, key, compute):
+        arrays = self.load(key)
+        if arrays is None:
+            self.save(key, compute())
+            arrays = self.load(key)
+        return arrays